@@ -7,7 +7,9 @@
 import sys
 from project_protests.newspaper.compile_news_data import compile_news_data
 import os
-from  project_protests.html.dashboard import app
+from  project_protests.html.dashboard import app, warm_figures
+from project_protests.html.figure_cache import build_figures
+from project_protests.protest.process_protest_data import process_protest_data
 import random
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
@@ -16,6 +18,7 @@ port = random.randint(5000, 10000)
 if __name__ == "__main__":
 
     if len(sys.argv) == 1 :
+        warm_figures()
         app.run_server(port=port,debug = True)
 
     elif len(sys.argv) == 2:
@@ -23,15 +26,26 @@ if __name__ == "__main__":
             compile_news_data()
         elif sys.argv[1] == "run":
             compile_news_data()
+            warm_figures()
             app.run_server(port=port,debug = True)
+        elif sys.argv[1] == "serve":
+            from project_protests.wsgi import serve
+            serve()
+        elif sys.argv[1] == "process_protest":
+            process_protest_data()
+        elif sys.argv[1] == "build_figures":
+            built = build_figures()
+            print("Built figures: {}".format(", ".join(built) or "none, all up to date"))
         else:
-            print("Incorrect arguments. Send 'compile_news' or 'run'.")
+            print("Incorrect arguments. Send 'compile_news', 'run', 'serve',\
+                    'process_protest' or 'build_figures'.")
     
     elif len(sys.argv) == 3:
         if sys.argv[1] == "compile_news" and sys.argv[2] == "collect_data":
             compile_news_data(True)
         elif sys.argv[1] == "run" and sys.argv[2] == "collect_data":
             compile_news_data(collect_data = True)
+            warm_figures()
             app.run_server(port=port,debug = True)
         else:
             print("Incorrect arguments. Send 'compile_news' or 'run' as first\
@@ -0,0 +1,184 @@
+##################################################
+# Task: Benchmark the data cleaning stages       #
+##################################################
+
+import sys
+import json
+import re
+import time
+import pathlib
+import nltk
+from bs4 import BeautifulSoup
+from project_protests.newspaper.the_guardian.clean_files import list_page_files
+from project_protests.newspaper.the_guardian.html_text import first_paragraph, strip_tags
+from project_protests.newspaper.storage import read_news
+from project_protests import nltk_resources
+from project_protests.sentiment_analysis.text_processing import tokenize_articles, ADDITIONAL_STOP_WORDS
+
+current_dir = pathlib.Path(__file__).parent
+
+
+def time_function(func, values, repeat = 3):
+    """
+    Time a function applied to every value and keep the best run
+
+    Inputs:
+        func (function): function to time
+        values (lst): inputs of the function
+        repeat (int): number of runs
+
+    Return (float): best time in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            func(value)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def bs4_extraction(article):
+    """
+    Previous extraction: build the full BeautifulSoup tree of the body, take
+    the first <p> and remove tags and hrefs from it and from the standfirst
+    with two regex passes each
+
+    Input:
+        article (tuple): html body and standfirst of the article
+
+    Return (tuple): lead paragraph and standfirst
+    """
+    body, standfirst = article
+    texts = []
+    for text in (str(BeautifulSoup(body, "html.parser").p), standfirst):
+        text = re.sub(r"</?\w>?", "", text)
+        texts.append(re.sub(r"href=\S*?>", "", text))
+
+    return tuple(texts)
+
+
+def lxml_extraction(article):
+    """
+    Current extraction used by the Guardian cleaner
+
+    Input:
+        article (tuple): html body and standfirst of the article
+
+    Return (tuple): lead paragraph and standfirst
+    """
+    body, standfirst = article
+
+    return first_paragraph(body), strip_tags(standfirst)
+
+
+def html_extraction(repeat = 3):
+    """
+    Compare the BeautifulSoup and the lxml extraction of the lead paragraph
+    and standfirst of the articles in the Guardian json files
+
+    Inputs:
+        repeat (int): number of runs of each extraction
+
+    Return (dict): best time in seconds of each extraction
+    """
+    articles = []
+    for page in list_page_files(current_dir / "newspaper/the_guardian/json_files"):
+        with open(page) as f:
+            for article in json.load(f)["response"]["results"]:
+                fields = article["fields"]
+                articles.append((fields["body"], fields["standfirst"]))
+
+    results = {"beautifulsoup": time_function(bs4_extraction, articles, repeat),
+                "lxml": time_function(lxml_extraction, articles, repeat)}
+    report("Lead paragraph and standfirst of {} articles".format(len(articles)),
+            results, "beautifulsoup", "lxml")
+
+    return results
+
+
+def nltk_clean(texts):
+    """
+    Previous tokenization: join the articles of a year in one string, split
+    it with the NLTK sentence and word tokenizers and check every word
+    against a list of stop words
+
+    Input:
+        texts (lst): lead paragraphs of a year
+
+    Return (lst): list of words of each sentence
+    """
+    text = " ".join(texts).lower()
+    text = re.sub('[^a-zA-Z]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    words = [nltk.word_tokenize(sent) for sent in nltk.sent_tokenize(text)]
+    stop_words = nltk_resources.stop_words() + ADDITIONAL_STOP_WORDS
+    for i in range(len(words)):
+        words[i] = [w for w in words[i] if w not in stop_words and len(w) > 2]
+
+    return words
+
+
+def stream_tokenization(texts):
+    """
+    Current tokenization used by the Word2Vec models
+
+    Input:
+        texts (lst): lead paragraphs of a year
+
+    Return (lst): list of words of each article
+    """
+    return list(tokenize_articles(texts))
+
+
+def tokenization(repeat = 3):
+    """
+    Compare the NLTK and the streaming tokenization of the lead paragraphs of
+    every year of the compiled news data
+
+    Inputs:
+        repeat (int): number of runs of each tokenization
+
+    Return (dict): best time in seconds of each tokenization
+    """
+    df = read_news(current_dir / "newspaper/news_compiled.csv",
+                    ["date", "lead_paragraph"])
+    df = df.dropna(subset = ["lead_paragraph"])
+    nltk_resources.sentence_tokenizer_resource()
+    years = [list(texts) for _, texts in
+            df.groupby(df["date"].dt.year)["lead_paragraph"]]
+
+    results = {"nltk": time_function(nltk_clean, years, repeat),
+                "streaming": time_function(stream_tokenization, years, repeat)}
+    report("Tokenization of {} lead paragraphs".format(len(df)),
+            results, "nltk", "streaming")
+
+    return results
+
+
+def report(title, results, baseline, candidate):
+    """
+    Print the timings of a benchmark
+
+    Inputs:
+        title (str): description of the benchmark
+        results (dict): best time in seconds of each implementation
+        baseline (str): name of the previous implementation
+        candidate (str): name of the current implementation
+    """
+    print(title)
+    for name, seconds in results.items():
+        print("  {:<15}{:.3f} s".format(name, seconds))
+    print("  speed-up       {:.1f}x".format(results[baseline] / results[candidate]))
+
+
+BENCHMARKS = {"html_extraction": html_extraction,
+                "tokenization": tokenization}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -0,0 +1,126 @@
+##################################################
+# Task: Load each dataset once per process       #
+##################################################
+
+import os
+import hashlib
+import threading
+
+_cache = {}
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_lock = threading.Lock()
+
+
+def file_hash(path):
+    """
+    Compute the sha256 hash of a file
+
+    Inputs:
+        path (str): path of the file
+
+    Return (str): hexadecimal hash
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def file_version(path):
+    """
+    Get a cheap version of a file: its modification time and size
+
+    Inputs:
+        path (str): path of the file
+
+    Return (tuple): modification time (ns) and size of the file
+    """
+    stat = os.stat(path)
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def cache_key(path, loader, args):
+    """
+    Build the key of a dataset in the cache
+
+    Inputs:
+        path (str): path of the file the dataset is loaded from
+        loader (function): function that loads the dataset
+        args (tuple): extra arguments of the loader
+
+    Return (tuple): hashable key
+    """
+    args = tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+
+    return (str(path), loader.__module__, loader.__qualname__, args)
+
+
+def load(path, loader, *args):
+    """
+    Load a dataset once per process. The dataset is loaded again only when
+    its file changes: the modification time and size are checked on every
+    call and, if they changed, the file hash decides if the content did.
+
+    The cached frame is never handed out: callers get a shallow copy of it,
+    which shares the data of the cache but not its columns. Adding, dropping,
+    renaming or replacing columns of the copy leaves the cache untouched;
+    writing into its values in place (e.g. with .loc) is not allowed.
+
+    Inputs:
+        path (str): path of the file the dataset is loaded from
+        loader (function): function that takes the path (and args) and returns
+            the dataset
+        args: extra arguments passed to the loader
+
+    Return (DataFrame): shallow copy of the dataset
+    """
+    key = cache_key(path, loader, args)
+    version = file_version(path)
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry["version"] != version and \
+                entry["hash"] == file_hash(path):
+            entry["version"] = version
+
+        if entry is not None and entry["version"] == version:
+            _stats["hits"] += 1
+            return entry["frame"].copy(deep = False)
+
+        if entry is not None:
+            _stats["invalidations"] += 1
+        _stats["misses"] += 1
+
+    frame = loader(path, *args)
+    with _lock:
+        _cache[key] = {"frame": frame, "version": version,
+                        "hash": file_hash(path)}
+
+    return frame.copy(deep = False)
+
+
+def cache_info():
+    """
+    Get the counters of the cache
+
+    Return (dict): number of hits, misses and invalidations, and number of
+        cached datasets
+    """
+    with _lock:
+        info = dict(_stats)
+        info["size"] = len(_cache)
+
+    return info
+
+
+def clear_cache():
+    """
+    Remove every dataset from the cache and reset its counters
+    """
+    with _lock:
+        _cache.clear()
+        for counter in _stats:
+            _stats[counter] = 0
@@ -3,6 +3,7 @@
 ###Last Modification: 03.05.2023
 
 import dash
+import threading
 import pandas as pd
 import dash_bootstrap_components as dbc
 from dash import dcc
@@ -11,18 +12,23 @@ import plotly.express as px
 import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 from project_protests.html.text_inputs import HTML_TEXT , DATA_TEXT
-from project_protests.visualizations.protest_viz import protest_by_city
 from project_protests.visualizations.pairwise_viz import visualize_similarity
-from project_protests.visualizations.news_viz import news_counts, month_corr
 from project_protests.visualizations.sentiment_viz import visualize_sentiment_scores
-from project_protests.visualizations.budget_viz import budget_viz
-app = dash.Dash(__name__,external_stylesheets=[dbc.themes.PULSE],suppress_callback_exceptions=True)
-
-fig_protest = protest_by_city()
-fig_similarity = visualize_similarity()
-fig_news = news_counts()
-fig_month_corr = month_corr()
-fig_budget = budget_viz()
+from project_protests.html.figure_cache import figure_specs, load_figure
+try:
+    import flask_compress
+except ImportError:
+    flask_compress = None
+
+# gzip the figures sent to the browser when flask-compress is installed
+app = dash.Dash(__name__,external_stylesheets=[dbc.themes.PULSE],suppress_callback_exceptions=True,
+                compress=flask_compress is not None)
+
+DEFAULT_SECTION = "lead_paragraph"
+DEFAULT_TERM = "police"
+_figures = {}
+_figure_locks = {}
+_figures_lock = threading.Lock()
 background_color = "background-color : rgb(255, 251, 250)"
 style_h1 = {"padding":"25px", "text-align":"center", "border-width": "1px", "border-style": "solid"} 
 style_p = {"padding":"10px","text-align":"left",
@@ -35,6 +41,46 @@ style_t = {"text-center":"center","font-family":r"Arial",
 "font-weight":"bold","margin-left":"8cm","margin-right":"5cm"}
 
 
+def get_figure(name):
+    """
+    Get a figure of the dashboard the first time it is needed, from its saved
+    JSON file when it is up to date or by building it otherwise. Each figure
+    has its own lock, so a figure being built only makes the requests for
+    that same figure wait.
+    Input:
+    - name (str): Name of the figure (a key of figure_cache.figure_specs)
+    Return: Plotly figure
+    """
+    with _figures_lock:
+        if name in _figures:
+            return _figures[name]
+        lock = _figure_locks.setdefault(name, threading.Lock())
+
+    with lock:
+        if name not in _figures:
+            fig = load_figure(name)
+            with _figures_lock:
+                _figures[name] = fig
+        return _figures[name]
+
+def build_figures():
+    """
+    Get every figure of the dashboard, including the saved views of the
+    sentiment and word similarity graphs
+    """
+    for name in figure_specs():
+        get_figure(name)
+
+def warm_figures():
+    """
+    Build the figures in a background thread so the first visit to the home
+    page does not wait for them
+    Return: Thread building the figures
+    """
+    thread = threading.Thread(target=build_figures, daemon=True)
+    thread.start()
+    return thread
+
 title_container = dbc.Container(
     fluid = True,
     style={
@@ -83,9 +129,30 @@ def update_sentiment_graph(section):
     - section (str): Possible values of the dropdown for the graph
     Retur: Graph figure.
     """
+    if "sentiment_" + section in figure_specs():
+        return [get_figure("sentiment_" + section)]
     fig = visualize_sentiment_scores(section)
     return [fig]
 
+@app.callback(
+    [Output(component_id="News_pairwise",component_property="figure")],
+    [Input(component_id="similarity_term",component_property="value")]
+)
+
+def update_similarity_graph(term):
+    """
+    Updated word similarity graph according to the term typed by the user
+    Input:
+    - term (str): Term to find the most similar words to
+    Retur: Graph figure.
+    """
+    if not term or not term.strip():
+        term = DEFAULT_TERM
+    if "similarity_" + term.strip().lower() in figure_specs():
+        return [get_figure("similarity_" + term.strip().lower())]
+    fig = visualize_similarity(term)
+    return [fig]
+
 @app.callback(
     [Output(component_id="page-content",component_property="children")],
     [Input(component_id="url",component_property="pathname")]
@@ -105,16 +172,16 @@ def render_page_content(pathname):
                 html.P(HTML_TEXT["paragraphs"]["team"],style = style_p),
                 html.H2(HTML_TEXT["subtitles"]["Number of protest"],style = style_h2),
                 html.P(HTML_TEXT["graph_info"]["protest"], style=style_p),
-                dcc.Graph(id="protest_number",figure=fig_protest),
+                dcc.Graph(id="protest_number",figure=get_figure("protest")),
                 html.H2(HTML_TEXT["subtitles"]["News"], style=style_h2),
                 html.P(HTML_TEXT["graph_info"]["news"], style=style_p),
-                dcc.Graph(id="news_counts",figure=fig_news),
+                dcc.Graph(id="news_counts",figure=get_figure("news")),
                 html.P("To complement the analysis, we graphed the correlation matrix "
                 "between the different variables, where it is posible to observe that " 
                 "there is a positive correlation between the number of protests and " 
                 "the number of news stories. This relationship was not as strong as we expected "
                 "but again may be due to the upward spike in the protest data after 2020.", style = style_p),
-                dcc.Graph(id="month_corr",figure=fig_month_corr),
+                dcc.Graph(id="month_corr",figure=get_figure("month_corr")),
                 html.H2(HTML_TEXT["subtitles"]["Sentiment_Score"], style=style_h3),
                 html.P(HTML_TEXT["graph_info"]["sentiment"], style=style_p),
                 html.P(HTML_TEXT["graph_info"]["sentiment_2"], style=style_p),
@@ -125,17 +192,24 @@ def render_page_content(pathname):
                                 {"label": "Lead Paragrah", "value": "lead_paragraph"},
                                 ],
                             multi=False,
-                            value="lead_paragraph",
+                            value=DEFAULT_SECTION,
                             style={'width': "40%","font":"Arial"}
                             ),
                 dcc.Graph(id="sentiment_score_graph",figure={}),
                 html.H2(HTML_TEXT["subtitles"]["Pairwise"], style=style_h3),
                 html.P(HTML_TEXT["graph_info"]["pairwise"], style=style_p),
-                dcc.Graph(id="News_pairwise",figure=fig_similarity),
+                dcc.Input(id="similarity_term",
+                            type="text",
+                            value=DEFAULT_TERM,
+                            debounce=True,
+                            placeholder="Term",
+                            style={'width': "40%","font":"Arial","margin-left":"5cm"}
+                            ),
+                dcc.Graph(id="News_pairwise",figure={}),
                 html.Br(),
                 html.H2(HTML_TEXT["subtitles"]["Police"],style = style_h2),
                 html.P(HTML_TEXT["graph_info"]["budget"], style=style_p),
-                dcc.Graph(id="budget",figure=fig_budget),
+                dcc.Graph(id="budget",figure=get_figure("budget")),
                 html.Br(),
                 html.Br(),
                 html.H2(HTML_TEXT["subtitles"]["Conclusion"],style = style_h2),
@@ -0,0 +1,155 @@
+##################################################
+# Task: Save the dashboard figures as JSON files #
+##################################################
+
+import os
+import json
+import pathlib
+import plotly.io as pio
+from project_protests import data_access
+from project_protests.visualizations.protest_viz import protest_by_city, protest_filepath
+from project_protests.visualizations.news_viz import news_counts, month_corr, nyt_filepath, guardian_filepath
+from project_protests.visualizations.budget_viz import budget_viz
+from project_protests.visualizations.sentiment_viz import visualize_sentiment_scores
+from project_protests.visualizations.pairwise_viz import visualize_similarity
+from project_protests.police_budget.budget_analysis import budget_filepath
+from project_protests.sentiment_analysis.sentiment_analysis import lexicon_version
+from project_protests.sentiment_analysis.pairwise_correlation import compiled_filepath, model_version
+
+figures_dir = pathlib.Path(__file__).parent / "figures"
+package_dir = pathlib.Path(__file__).parent.parent
+SENTIMENT_SECTIONS = ["headline", "lead_paragraph"]
+SIMILARITY_TERMS = ["police"]
+
+
+def figure_specs():
+    """
+    Describe every figure of the dashboard: the function that builds it, the
+    data files it is built from and the settings (besides the data) that
+    change it
+
+    Return (dict): (function, list of paths, settings) of each figure name
+    """
+    specs = {
+        "protest": (protest_by_city, [protest_filepath], ""),
+        "news": (news_counts, [nyt_filepath, guardian_filepath,
+                protest_filepath], ""),
+        "month_corr": (month_corr, [nyt_filepath, guardian_filepath,
+                protest_filepath], ""),
+        "budget": (budget_viz, [budget_filepath], "")}
+    for section in SENTIMENT_SECTIONS:
+        specs["sentiment_" + section] = (
+            lambda section = section: visualize_sentiment_scores(section),
+            [nyt_filepath, guardian_filepath], lexicon_version())
+    for term in SIMILARITY_TERMS:
+        specs["similarity_" + term] = (
+            lambda term = term: visualize_similarity(term),
+            [compiled_filepath], model_version())
+
+    return specs
+
+
+def input_hashes(paths):
+    """
+    Hash the data files a figure is built from
+
+    Inputs:
+        paths (lst): paths of the data files
+
+    Return (dict): hash of each file (None if it does not exist), by path
+        relative to the package
+    """
+    hashes = {}
+    for path in paths:
+        name = os.path.relpath(path, package_dir)
+        hashes[name] = data_access.file_hash(path) if os.path.exists(path) \
+                        else None
+
+    return hashes
+
+
+def figure_path(name):
+    """
+    Get the path of the saved figure and of its description
+
+    Inputs:
+        name (str): name of the figure
+
+    Return (tuple): path of the figure JSON and of the description JSON
+    """
+    return figures_dir / (name + ".json"), figures_dir / (name + ".meta.json")
+
+
+def is_fresh(name, key):
+    """
+    Check if a figure was saved from the same data and settings
+
+    Inputs:
+        name (str): name of the figure
+        key (dict): hashes of the data files and settings of the figure
+
+    Return (bool): True if the saved figure can be used
+    """
+    path, meta_path = figure_path(name)
+    if not path.exists() or not meta_path.exists():
+        return False
+    with open(meta_path) as f:
+        return json.load(f) == key
+
+
+def save_figure(name, fig, key):
+    """
+    Save a figure as JSON with the description of its data
+
+    Inputs:
+        name (str): name of the figure
+        fig (Figure): plotly figure
+        key (dict): hashes of the data files and settings of the figure
+    """
+    path, meta_path = figure_path(name)
+    os.makedirs(figures_dir, exist_ok = True)
+    if meta_path.exists():
+        os.remove(meta_path)
+    with open(str(path) + ".tmp", "w") as f:
+        f.write(fig.to_json())
+    os.replace(str(path) + ".tmp", path)
+    with open(meta_path, "w") as f:
+        json.dump(key, f)
+
+
+def load_figure(name):
+    """
+    Get a figure of the dashboard: it is read from its JSON file if it was
+    saved from the current data, otherwise it is built and saved again
+
+    Inputs:
+        name (str): name of the figure (a key of figure_specs)
+
+    Return (Figure): plotly figure
+    """
+    build, paths, settings = figure_specs()[name]
+    key = {"inputs": input_hashes(paths), "settings": settings}
+    if is_fresh(name, key):
+        with open(figure_path(name)[0]) as f:
+            return pio.from_json(f.read(), skip_invalid = True)
+
+    fig = build()
+    save_figure(name, fig, key)
+
+    return fig
+
+
+def build_figures():
+    """
+    Build and save every stale figure of the dashboard
+
+    Return (lst): names of the figures that were built
+    """
+    built = []
+    for name, (build, paths, settings) in figure_specs().items():
+        key = {"inputs": input_hashes(paths), "settings": settings}
+        if not is_fresh(name, key):
+            save_figure(name, build(), key)
+            built.append(name)
+
+    return built
@@ -33,7 +33,7 @@ HTML_TEXT = {
         "sentiment_3": "During the analysis we discovered that there were important limitations in applying this model to the data. Given the complexity of the issue, the results of the sentiment score are highly likely to not be reflective of the level of support for the Black Lives Matter movements and the reforms being pursued by them which could be solved by training our own data to determine which stories are associated with support and opposition to the Black Lives Matter movement which could not be included due to capacity and time constraints.",
         "news": "There is a clear spike in 2020 of the number of stories from The New York Times and The Guardian covering the Black Lives Matter movement. Both newspapers reached around 750 stories each (1,513 in total). This makes sense because protests related to the movement also increased during the same year after the killings of George Floyd, Breonna Taylor, and Ahmaud Arbery. However, there is a decrease in the coverage in 2021 and 2022 from both newspapers and an increase of protests related to the Black Lives Matter movement in the same period of time. The decrease in number of stories could be due to diminishing attention to the movement and less stories to cover. The increase in protests may be due to Crowd Counting Consortium still developing their data collection methods during 2020 and improving their methods in 2021. ", 
         "budget": "The main effort behind the Black Lives Matter movement is to defund the police and use this funding for community services such as housing, parks, or healthcare. The chart below visualizes the budget per capita in eight different cities with major protest involvement. The budget per capita has steadily increased since FY2016. Some cities like Minneapolis and Detroit decreased their budget after FY2020, but still increased their budget in the years after. This demonstrates that the calls to defund the police has not affected local budgets in these cities. ",
-        "pairwise": "The graph below shows the words most similar to the term, police, per year from 2017-2022. The scores designate similarity from 1 being the exact same to -1 being the exact opposite. Because of the selective filtering we did on the initial newspaper dataset, the words usually surrounding “police” are related to the BLM movement. There is a noticeable trend of words related to George Floyd in 2020 and 2021. You can also see the decrease in score before 2020 and after 2021 as more articles were produced around the Floyd protests in 2020. The impact of George Floyd on articles around BLM and the police are clear as words like Floyd, Chauvin (officer who killed Floyd), Minneapolis show up even in 2022. In the future, understanding the perception of police in the media would require filtering for a more neutral sample of articles to build the model. "
+        "pairwise": "The graph below shows the words most similar to the term, police, per year (type another term in the box to explore it) from 2017-2022. The scores designate similarity from 1 being the exact same to -1 being the exact opposite. Because of the selective filtering we did on the initial newspaper dataset, the words usually surrounding “police” are related to the BLM movement. There is a noticeable trend of words related to George Floyd in 2020 and 2021. You can also see the decrease in score before 2020 and after 2021 as more articles were produced around the Floyd protests in 2020. The impact of George Floyd on articles around BLM and the police are clear as words like Floyd, Chauvin (officer who killed Floyd), Minneapolis show up even in 2022. In the future, understanding the perception of police in the media would require filtering for a more neutral sample of articles to build the model. "
     }, 
 }
 
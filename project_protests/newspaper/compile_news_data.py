@@ -10,28 +10,36 @@ from project_protests.newspaper.nyt.clean_data import create_csv
 from project_protests.newspaper.the_guardian.make_requests import get_json_files
 from project_protests.newspaper.the_guardian.clean_files import create_news_csv
 from project_protests.config import the_guardian_api_key
+from project_protests.newspaper.storage import write_columnar
+from project_protests.query_params import workers
 
 
-def compile_news_data(collect_data = False):
+def compile_news_data(collect_data = False, workers = workers, incremental = True):
     """
     Obtain the data from both NYT and The Guardian and compile it into one csv
     
     Inputs:
         collect_data (bool): If True collect_json files, if False skicompilep and move
         on to compilling csv files
+        workers (int): number of processes used to parse the json files. None
+        or 1 parses them one after the other.
+        incremental (bool): If True only request the pages that are missing or
+        stale according to the collection manifest, if False request everything
+        again
     
     Return:
-    None - saves a csv that compiles the information of both newspapers
+    None - saves a csv that compiles the information of both newspapers and a
+    typed Parquet copy of it
     """
 
     #Create json files and subdirectories:
     if collect_data:
-        create_dirs()
-        get_json_files(the_guardian_api_key)
+        create_dirs(incremental = incremental)
+        get_json_files(the_guardian_api_key, incremental = incremental)
 
     #Save json files as csv's
-    create_csv()
-    create_news_csv()
+    create_csv(workers = workers)
+    create_news_csv(workers = workers)
 
     #Compile csv's and save data
     current_dir = os.path.dirname(os.path.realpath(__file__))
@@ -46,7 +54,9 @@ def compile_news_data(collect_data = False):
 
     news_df = pd.concat([nyt_df,the_guardian_df])
 
-    news_df.to_csv(os.path.join(current_dir, "news_compiled.csv"), index = False)
+    compiled_path = os.path.join(current_dir, "news_compiled.csv")
+    news_df.to_csv(compiled_path, index = False)
+    write_columnar(news_df, compiled_path)
 
 
 
@@ -0,0 +1,263 @@
+##################################################
+# Task: Schedule requests to the newspaper APIs  #
+##################################################
+
+import json
+import threading
+import contextlib
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket used to keep requests under an API quota. Tokens
+    are added at a constant rate up to the size of the bucket and every
+    request takes one token, waiting until one is available.
+    """
+
+    def __init__(self, requests_per_minute, burst = 1):
+        """
+        Inputs:
+            requests_per_minute (float): rate at which tokens are added
+            burst (int): maximum number of tokens that can be stored, i.e. the
+                number of requests that can be sent back to back
+        """
+        self.rate = requests_per_minute / 60
+        self.capacity = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token from the bucket, sleeping until one is available
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size = 4):
+    """
+    Create a requests session that keeps its connections alive and shares
+    them between the threads of a scheduler
+
+    Inputs:
+        pool_size (int): number of connections kept per host
+
+    Return (Session): requests session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def write_json(data, file_name, on_saved = None):
+    """
+    Save a JSON response in a file
+
+    Inputs:
+        data (dict): parsed JSON response
+        file_name (str): path of the file to create
+        on_saved (function): function called with the file name once the file
+            is complete
+    """
+    with open(file_name, "w") as f:
+        json.dump(data, f, indent=1)
+
+    if on_saved is not None:
+        on_saved(file_name)
+
+
+def retry_wait(resp, default):
+    """
+    Get the seconds to wait before retrying a request
+
+    Inputs:
+        resp (Response): response of the failed request
+        default (float): seconds to wait if the response does not say
+
+    Return (float): seconds to wait
+    """
+    retry_after = resp.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return float(retry_after)
+
+    return default
+
+
+class FetchScheduler:
+    """
+    Send GET requests from a pool of threads that share one keep-alive session
+    and one token bucket, and write the JSON responses from a separate thread
+    so saving a page overlaps with waiting for the next ones.
+    Use it as a context manager: leaving the block waits for every pending
+    request and write, or cancels the requests that have not started if the
+    block raised an error.
+    """
+
+    def __init__(self, requests_per_minute = 60, burst = 1, max_workers = 4,
+                session = None, max_retries = 5, backoff = 2, timeout = 30):
+        """
+        Inputs:
+            requests_per_minute (float): request quota of the API
+            burst (int): number of requests that can be sent back to back
+            max_workers (int): number of requests that can be waiting for a
+                response at the same time
+            session (Session): session to reuse. A pooled session is created
+                if None.
+            max_retries (int): number of times a request that fails with a
+                429 or 5xx status, a connection error or a timeout is sent
+                again
+            backoff (float): seconds to wait before the first retry. The wait
+                doubles with every retry.
+            timeout (float): seconds to wait for the server to answer
+        """
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or make_session(max_workers)
+        self.requests = ThreadPoolExecutor(max_workers = max_workers)
+        self.writer = ThreadPoolExecutor(max_workers = 1)
+        self.writes = []
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close(cancel = exc_type is not None)
+
+    def close(self, cancel = False):
+        """
+        Wait for the pending requests and writes and release the connections.
+        Errors raised while writing a file are raised here.
+
+        Inputs:
+            cancel (bool): if True, the requests that have not started are
+                cancelled instead of sent
+        """
+        if cancel:
+            cancel_pending(self.futures)
+        self.requests.shutdown(wait = True)
+        self.writer.shutdown(wait = True)
+        self.session.close()
+        for write in self.writes:
+            write.result()
+
+    def get(self, url):
+        """
+        Send a GET request once the quota allows it. Requests rejected because
+        of the rate limit (429) or a server error (5xx) are retried with an
+        exponential backoff, or after the time given by the Retry-After header.
+        Requests that fail to connect or time out are retried with the same
+        backoff.
+
+        Inputs:
+            url (str): url of the request
+
+        Return (Response): response of the request
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                resp = self.session.get(url, timeout = self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            if resp.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                break
+            time.sleep(retry_wait(resp, self.backoff * 2 ** attempt))
+
+        resp.raise_for_status()
+
+        return resp
+
+    def get_json(self, url, file_name = None, on_saved = None):
+        """
+        Send a GET request and parse its JSON response. If file_name is given
+        the response is also written to that file by the writer thread.
+
+        Inputs:
+            url (str): url of the request
+            file_name (str): path of the file where to save the response
+            on_saved (function): function called by the writer thread with
+                the file name once the file is complete
+
+        Return (dict): parsed JSON response
+        """
+        data = self.get(url).json()
+        if file_name is not None:
+            self.writes.append(self.writer.submit(write_json, data, file_name,
+                                                on_saved))
+
+        return data
+
+    def submit(self, url, file_name = None, on_saved = None):
+        """
+        Schedule get_json in the request threads
+
+        Inputs:
+            url (str): url of the request
+            file_name (str): path of the file where to save the response
+            on_saved (function): function called by the writer thread with
+                the file name once the file is complete
+
+        Return (Future): future with the parsed JSON response
+        """
+        future = self.requests.submit(self.get_json, url, file_name, on_saved)
+        self.futures = [f for f in self.futures if not f.done()] + [future]
+
+        return future
+
+
+def cancel_pending(futures):
+    """
+    Cancel the requests that have not started yet
+
+    Inputs:
+        futures (lst): futures returned by FetchScheduler.submit
+    """
+    for future in futures:
+        future.cancel()
+
+
+def scheduler_context(scheduler, requests_per_minute, burst = 1,
+                    max_workers = 4):
+    """
+    Get the scheduler a collection sends its requests with. A scheduler
+    passed by the caller is used as it is and stays open, so it can be shared
+    by several collections; otherwise a new one is created and closed at the
+    end of the block.
+
+    Inputs:
+        scheduler (FetchScheduler): scheduler of the caller, or None
+        requests_per_minute (float): request quota of a new scheduler
+        burst (int): number of requests a new scheduler can send back to back
+        max_workers (int): number of concurrent requests of a new scheduler
+
+    Return (context manager): context that gives the scheduler
+    """
+    if scheduler is not None:
+        return contextlib.nullcontext(scheduler)
+
+    return FetchScheduler(requests_per_minute, burst, max_workers)
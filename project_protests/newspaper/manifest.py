@@ -0,0 +1,188 @@
+##################################################
+# Task: Keep track of the collected JSON pages   #
+##################################################
+
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+MANIFEST_PATH = os.path.join(current_dir, "collection_manifest.jsonl")
+API_KEY_RE = re.compile(r"api-key=[^&]*")
+
+
+def file_checksum(file_path):
+    """
+    Compute the sha256 checksum of a file
+
+    Inputs:
+        file_path (str): path of the file
+
+    Return (str): hexadecimal checksum
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def query_id(url):
+    """
+    Identify the query of a request by hashing its url without the API key, so
+    pages collected with a different query are not reused
+
+    Inputs:
+        url (str): url of the request
+
+    Return (str): hexadecimal hash of the query
+    """
+    return hashlib.sha256(API_KEY_RE.sub("", url).encode()).hexdigest()
+
+
+def fresh_after(end_date):
+    """
+    Get the time after which a page of a period is considered final. Pages
+    fetched before the day after the end of the period may miss articles
+    published later, so they are fetched again.
+
+    Inputs:
+        end_date (str): end date of the period (YYYYMMDD or YYYY-MM-DD)
+
+    Return (datetime): time after which a fetched page is not stale
+    """
+    end = datetime.strptime(end_date.replace("-", ""), "%Y%m%d")
+
+    return end + timedelta(days = 1)
+
+
+class Manifest:
+    """
+    Manifest of the completed (source, unit, page) downloads with the checksum
+    of the saved file. Entries are appended to a JSON lines file as soon as a
+    page is saved, so an interrupted crawl can resume from the pages already
+    written.
+    """
+
+    def __init__(self, path = MANIFEST_PATH):
+        """
+        Inputs:
+            path (str): path of the manifest file
+        """
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """
+        Read the manifest file. Later entries of a page replace earlier ones
+        and an incomplete last line (interrupted write) is ignored.
+        """
+        self.entries = {}
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries[self.key(entry["source"], entry["unit"],
+                            entry["page"])] = entry
+
+    def reset(self, source):
+        """
+        Forget every page of a source
+
+        Inputs:
+            source (str): name of the source ("nyt" or "the_guardian")
+        """
+        with self.lock:
+            self.entries = {key: entry for key, entry in self.entries.items()
+                            if entry["source"] != source}
+            self.rewrite()
+
+    def forget_pages_above(self, source, unit, n_pages):
+        """
+        Forget the pages of a unit numbered above its current number of pages
+
+        Inputs:
+            source (str): name of the source
+            unit (str): unit of the crawl the pages belong to
+            n_pages (int): last page number of the unit
+        """
+        with self.lock:
+            extra = [key for key, entry in self.entries.items()
+                    if entry["source"] == source and entry["unit"] == unit
+                    and entry["page"] > n_pages]
+            if extra:
+                for key in extra:
+                    del self.entries[key]
+                self.rewrite()
+
+    def rewrite(self):
+        """
+        Write the manifest file again with only the current entries
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(source, unit, page):
+        return "{}/{}/{}".format(source, unit, page)
+
+    def record(self, source, unit, page, file_path, url):
+        """
+        Add a saved page to the manifest
+
+        Inputs:
+            source (str): name of the source
+            unit (str): unit of the crawl the page belongs to (e.g. a month)
+            page (int): page number
+            file_path (str): path of the saved JSON file
+            url (str): url of the request
+        """
+        entry = {"source": source, "unit": unit, "page": int(page),
+                "file": os.path.relpath(file_path, os.path.dirname(self.path)),
+                "sha256": file_checksum(file_path), "query": query_id(url),
+                "fetched_at": datetime.now().isoformat(timespec = "seconds")}
+
+        with self.lock:
+            self.entries[self.key(source, unit, page)] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def is_complete(self, source, unit, page, file_path, url, fresh_time = None):
+        """
+        Check if a page was already saved with the same query, its file is
+        unchanged and it is not stale
+
+        Inputs:
+            source (str): name of the source
+            unit (str): unit of the crawl the page belongs to
+            page (int): page number
+            file_path (str): path where the page is saved
+            url (str): url of the request
+            fresh_time (datetime): pages fetched before this time are stale
+
+        Return (bool): True if the page does not need to be fetched again
+        """
+        entry = self.entries.get(self.key(source, unit, page))
+        if entry is None or entry["query"] != query_id(url):
+            return False
+        if fresh_time is not None and \
+                datetime.fromisoformat(entry["fetched_at"]) < fresh_time:
+            return False
+        if not os.path.exists(file_path):
+            return False
+
+        return file_checksum(file_path) == entry["sha256"]
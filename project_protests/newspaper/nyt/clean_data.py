@@ -7,50 +7,135 @@
 import pandas as pd
 import json
 import os
-from project_protests.query_params import query_lst, filters_lst
+import re
+import calendar
+from functools import partial
+from project_protests.query_params import query_lst, filters_lst, workers
+from project_protests.newspaper.tag_matching import match_tags
+from project_protests.newspaper.parallel import map_pages
+from project_protests.newspaper.storage import ColumnarWriter
 
+MONTHS = list(calendar.month_name)
+PAGE_FILE_RE = re.compile(r"^nyt_(\d+)\.json$")
 
-def create_csv(tags = query_lst, filters = filters_lst):
+
+def create_csv(tags = query_lst, filters = filters_lst, workers = workers):
     """
-    Create csv file with news articles related to BLM protests
+    Create csv file with news articles related to BLM protests. The JSON files
+    are read one at a time and each batch of articles is appended to the csv,
+    so memory use does not grow with the size of the archive.
 
     Inputs:
         tags (lst): list of tags to look for. The tags to filter for are looked
             in the filters of the articles.
         filters (lst): list of filters where to look tags. They can be "headline",
             "lead_paragraph" and/or "body"
-        begin_date (str): 8 digits (YYYYMMDD) string that specify the begin date
-            or from when to start looking for articles.
-        end_date (str): 8 digits (YYYYMMDD) string that specify the end date or
-            until when to stop looking for articles.
+        workers (int): number of processes used to parse the JSON files. None
+            or 1 parses them one after the other.
     """
 
-    d = {"id": [], "date": [], "url": [], "headline": [], "abstract": [],
-        "lead_paragraph": [], "type_of_material": [], "section_name": []}
-
     current_dir = os.path.dirname(os.path.realpath(__file__))
     new_dir = os.path.join(current_dir, "raw_data")
-    year_lst = os.listdir(new_dir)
+    batches = iter_batches(list_json_files(new_dir), tags, filters, workers)
+    write_batches(batches, os.path.join(new_dir, "nyt_articles.csv"))
+
+
+def list_json_files(raw_dir):
+    """
+    List the JSON files saved under raw_data/<year>/<month name>/ in
+    chronological order, and by page number within a month, so the articles
+    are written in the same order on every machine
+
+    Inputs:
+        raw_dir (str): path of the raw_data directory
+
+    Return (lst): paths of the JSON files
+    """
+    file_paths = []
+    years = [year for year in os.listdir(raw_dir)
+            if year.isdigit() and os.path.isdir(os.path.join(raw_dir, year))]
 
-    if 'nyt_articles.csv' in year_lst:
-        year_lst.remove("nyt_articles.csv")
+    for year in sorted(years, key = int):
+        year_dir = os.path.join(raw_dir, year)
+        months = [month for month in os.listdir(year_dir) if month in MONTHS]
 
-    for year in year_lst:
-        year_dir = os.path.join(new_dir, year)
-        month_lst = os.listdir(year_dir)
-        
-        for month in month_lst:
+        for month in sorted(months, key = MONTHS.index):
             month_dir = os.path.join(year_dir, month)
-            file_lst = os.listdir(month_dir)
+            pages = []
+            for file_name in os.listdir(month_dir):
+                match = PAGE_FILE_RE.match(file_name)
+                if match:
+                    pages.append((int(match.group(1)),
+                                os.path.join(month_dir, file_name)))
+
+            file_paths += [path for _, path in sorted(pages)]
+
+    return file_paths
+
+
+def iter_batches(file_paths, tags = query_lst, filters = filters_lst,
+                workers = None):
+    """
+    Yield one typed dataframe of articles per JSON file, in the order of
+    file_paths
+
+    Inputs:
+        file_paths (lst): paths of the JSON files to read
+        tags (lst): list of tags to look for
+        filters (lst): list of filters where to look tags
+        workers (int): number of processes used to parse the files
+
+    Return (generator): dataframes with the articles of each file
+    """
+    read_file = partial(read_json_file, tags = tags, filters = filters)
 
-            for file_name in file_lst:
-                file_path = os.path.join(month_dir, file_name)
-                f = open(file_path)
-                data = json.load(f)
-                update_dict(d, data)
+    return map_pages(read_file, file_paths, workers)
 
-    df = create_df(d, tags, filters)     
-    df.to_csv(os.path.join(new_dir, "nyt_articles.csv"), index=False)
+
+def read_json_file(file_path, tags = query_lst, filters = filters_lst):
+    """
+    Read a JSON file with NYT articles and create its dataframe
+
+    Inputs:
+        file_path (str): path of the JSON file
+        tags (lst): list of tags to look for
+        filters (lst): list of filters where to look tags
+
+    Return (DataFrame): dataframe with the articles of the file
+    """
+    d = {"id": [], "date": [], "url": [], "headline": [], "abstract": [],
+        "lead_paragraph": [], "type_of_material": [], "section_name": []}
+
+    with open(file_path) as f:
+        data = json.load(f)
+    update_dict(d, data)
+
+    return create_df(d, tags, filters)
+
+
+def write_batches(batches, file_path):
+    """
+    Write dataframes to a csv file, and to a typed Parquet file next to it,
+    one batch at a time. The files are first written to temporary paths so an
+    interrupted run does not leave truncated files behind.
+
+    Inputs:
+        batches (iterable): dataframes with the same columns
+        file_path (str): path of the csv file to create
+    """
+    tmp_path = file_path + ".tmp"
+    columnar = ColumnarWriter(file_path)
+    header = True
+
+    with open(tmp_path, "w", newline = "") as f:
+        for df in batches:
+            if header or len(df) > 0:
+                df.to_csv(f, index = False, header = header)
+                header = False
+            columnar.write(df)
+
+    os.replace(tmp_path, file_path)
+    columnar.close()
 
 
 def update_dict(d, json):
@@ -91,15 +176,7 @@ def create_df(d, tags, filters):
     df = pd.DataFrame(data=d)
 
     df = df.astype('string')
-    df["date"] = df["date"].astype('datetime64')
-
-    for tag in tags:
-        df[tag] = False
-        for fil in filters:
-            for index, row in df.iterrows():
-                if pd.isna(row[fil]):
-                    continue
-                if tag.lower() in row[fil].lower():
-                    df[tag][index] = True
-    
-    return df
\ No newline at end of file
+    df["date"] = pd.to_datetime(df["date"])
+    df = match_tags(df, tags, filters)
+
+    return df
@@ -4,24 +4,42 @@
 # Last updated: 03-07-23                         #
 ##################################################
 
-import time
-import requests
-import json
 import os
+import re
+import json
 import calendar
 import shutil
+from functools import partial
+from concurrent.futures import as_completed
 from project_protests.query_params import query_lst, from_date, to_date, filters_lst
+from project_protests.newspaper.fetching import FetchScheduler, scheduler_context, cancel_pending
+from project_protests.newspaper.manifest import Manifest, fresh_after
 from project_protests.config import nyt_api_key
 
 
 begin_date = from_date.replace("-", "")
 end_date = to_date.replace("-", "")
+NYT_ENDPOINT = "https://api.nytimes.com/svc/search/v2/articlesearch.json"
+REQUESTS_PER_MINUTE = 60
+MAX_WORKERS = 4
+PAGE_FILE_RE = re.compile(r"^nyt_(\d+)\.json$")
 
 def create_dirs(tags = query_lst, filters = filters_lst,
-                begin_date = begin_date, end_date = end_date):
+                begin_date = begin_date, end_date = end_date,
+                endpoint = NYT_ENDPOINT, api_key = nyt_api_key, scheduler = None,
+                incremental = True, manifest = None):
     """
     Create directories and all json files from articles that meet query search
-        parameters
+        parameters. The first page of every month is requested right away and
+        the remaining pages of a month are scheduled as soon as its first page
+        arrives, so requests for different months overlap while the scheduler
+        keeps them under the API quota.
+
+    Every saved page is recorded in the collection manifest. In incremental
+        mode only the pages that are missing, changed on disk or stale (fetched
+        before their month was over) are requested, so an interrupted crawl
+        picks up where it stopped. A month whose first page is fetched again
+        is fetched again entirely because its number of pages may change.
 
     Inputs:
         tags (lst): list of tags to look for. The tags to filter for are looked
@@ -32,51 +50,125 @@ def create_dirs(tags = query_lst, filters = filters_lst,
             or from when to start looking for articles.
         end_date (str): 8 digits (YYYYMMDD) string that specify the end date or
             until when to stop looking for articles.
+        endpoint (str): url of the Article Search API. It can point to a local
+            server that stands in for the API.
+        api_key (str): NYT API key
+        scheduler (FetchScheduler): scheduler used to send the requests. It is
+            left open so it can be shared with other calls. One limited to
+            REQUESTS_PER_MINUTE is created and closed if None.
+        incremental (bool): if False, remove every JSON file and fetch
+            everything again
+        manifest (Manifest): manifest of the collected pages. The default
+            manifest file is used if None.
     """
     
     current_dir = os.path.dirname(os.path.realpath(__file__))
     path = os.path.join(current_dir, "raw_data")
 
+    if manifest is None:
+        manifest = Manifest()
+
     # Remove directories and JSON files before creating them again if they
     # already existed
-    if os.path.exists(path):
-        folders = os.listdir(path)
-        folders.remove("nyt_articles.csv")
-        for folder in folders:
-            shutil.rmtree(os.path.join(path, folder), ignore_errors = True)
-    
+    if not incremental:
+        manifest.reset("nyt")
+        if os.path.exists(path):
+            for folder in os.listdir(path):
+                if os.path.isdir(os.path.join(path, folder)):
+                    shutil.rmtree(os.path.join(path, folder), ignore_errors = True)
+
+    with scheduler_context(scheduler, REQUESTS_PER_MINUTE,
+                        max_workers = MAX_WORKERS) as scheduler:
+        first_pages = {}
+        pages = []
+        try:
+            for month_begin, month_end in month_ranges(begin_date, end_date):
+                new_dir = month_dir(month_begin)
+                if os.path.exists(new_dir) == False:
+                    os.makedirs(new_dir)
+
+                url = create_url(tags, filters, month_begin, month_end, "0",
+                                endpoint, api_key)
+                file_name = os.path.join(new_dir, "nyt_0.json")
+                unit = month_begin[:6]
+
+                if manifest.is_complete("nyt", unit, 0, file_name, url,
+                                        fresh_after(month_end)):
+                    with open(file_name) as f:
+                        resp_json = json.load(f)
+                    pages += submit_pages(scheduler, resp_json, tags, filters,
+                                        month_begin, month_end, endpoint,
+                                        api_key, manifest, only_missing = True)
+                else:
+                    on_saved = partial(manifest.record, "nyt", unit, 0, url = url)
+                    future = scheduler.submit(url, file_name, on_saved)
+                    first_pages[future] = (month_begin, month_end)
+
+            for future in as_completed(first_pages):
+                month_begin, month_end = first_pages[future]
+                pages += submit_pages(scheduler, future.result(), tags, filters,
+                                    month_begin, month_end, endpoint, api_key,
+                                    manifest)
+
+            # Raise the errors of any failed request
+            for future in pages:
+                future.result()
+        except BaseException:
+            # Do not wait for the rest of the pages at the API rate
+            cancel_pending(list(first_pages) + pages)
+            raise
+
+
+def month_ranges(begin_date, end_date):
+    """
+    Split the query dates into months because the NYT API has a page limit of
+        200 pages per query search
+
+    Inputs:
+        begin_date (str): 8 digits (YYYYMMDD) string with the begin date
+        end_date (str): 8 digits (YYYYMMDD) string with the end date
+
+    Return (lst): list of (begin_date, end_date) tuples of every month
+    """
     begin_year = int(begin_date[:4])
     end_year = int(end_date[:4])
     first_month = 1
     last_month = 12
-    
-    # We create JSONs for each year and month because the NYT API has a page
-    # limit of 200 pages per query search
+    ranges = []
+
     for year in range(begin_year, end_year + 1):
         if year == end_year:
             last_month = int(end_date[4:6])
 
         for month in range(first_month, last_month + 1):
-            year_str = str(year)
-            month_dir = calendar.month_name[month]
-            new_dir = os.path.join(path, year_str, month_dir)
-            if os.path.exists(new_dir) == False:
-                os.makedirs(new_dir)
-            
-            month_str = str(month) 
-            if len(month_str) == 1:
-                month_str = "0" + month_str
-            
             _, day = calendar.monthrange(year, month)
-            begin_new = year_str + month_str + "01"
-            end_new = year_str + month_str + str(day)
-            get_json(tags, filters, begin_new, end_new)
+            month_str = str(year) + str(month).zfill(2)
+            ranges.append((month_str + "01", month_str + str(day)))
 
+    return ranges
 
-def get_json(tags, filters, begin_date, end_date):
+
+def month_dir(begin_date):
+    """
+    Get the directory where the JSON files of a month are saved
+
+    Inputs:
+        begin_date (str): 8 digits (YYYYMMDD) string with the begin date of
+            the month
+
+    Return (str): path of raw_data/<year>/<month name>
+    """
+    current_dir = os.path.dirname(os.path.realpath(__file__))
+    month_name = calendar.month_name[int(begin_date[4:6])]
+
+    return os.path.join(current_dir, "raw_data", begin_date[:4], month_name)
+
+
+def get_json(tags, filters, begin_date, end_date, endpoint = NYT_ENDPOINT,
+            api_key = nyt_api_key, scheduler = None, manifest = None):
     """
     Create json files from articles that meet query search parameters for a
-    specific year because of API restrictions with numbers of pages
+    specific month because of API restrictions with numbers of pages
 
     Inputs:
         tags (lst): list of tags to look for. The tags to filter for are looked
@@ -87,19 +179,60 @@ def get_json(tags, filters, begin_date, end_date):
             or from when to start looking for articles.
         end_date (str): 8 digits (YYYYMMDD) string that specify the end date or
             until when to stop looking for articles.
+        endpoint (str): url of the Article Search API
+        api_key (str): NYT API key
+        scheduler (FetchScheduler): scheduler used to send the requests. It is
+            left open so it can be shared with other calls. One limited to
+            REQUESTS_PER_MINUTE is created and closed if None.
+        manifest (Manifest): manifest where the saved pages are recorded
     """
-    year = begin_date[:4]
-    month_name = calendar.month_name[int(begin_date[4:6])]
-    resp = make_request(tags, filters, begin_date, end_date)
-    resp_json = json.loads(resp.text)
-    current_dir = os.path.dirname(os.path.realpath(__file__))
-    file_name = os.path.join(current_dir, "raw_data", year, month_name,
-                            "nyt_0.json")
-    
-    with open(file_name, "w") as f:
-        json.dump(resp_json, f, indent=1)
-        f.close()
+    new_dir = month_dir(begin_date)
+    os.makedirs(new_dir, exist_ok = True)
+
+    with scheduler_context(scheduler, REQUESTS_PER_MINUTE,
+                        max_workers = MAX_WORKERS) as scheduler:
+        url = create_url(tags, filters, begin_date, end_date, "0", endpoint,
+                        api_key)
+        file_name = os.path.join(new_dir, "nyt_0.json")
+        on_saved = None
+        if manifest is not None:
+            on_saved = partial(manifest.record, "nyt", begin_date[:6], 0,
+                            url = url)
+        resp_json = scheduler.get_json(url, file_name, on_saved)
+        pages = submit_pages(scheduler, resp_json, tags, filters, begin_date,
+                            end_date, endpoint, api_key, manifest)
+        try:
+            for future in pages:
+                future.result()
+        except BaseException:
+            cancel_pending(pages)
+            raise
+
+
+def submit_pages(scheduler, resp_json, tags, filters, begin_date, end_date,
+                endpoint = NYT_ENDPOINT, api_key = nyt_api_key, manifest = None,
+                only_missing = False):
+    """
+    Schedule the requests of the remaining pages of a month based on its first
+    page. Pages numbered above the current number of pages of the month, left
+    by a collection with more results or another query, are removed with
+    their manifest entries.
 
+    Inputs:
+        scheduler (FetchScheduler): scheduler used to send the requests
+        resp_json (dict): JSON response of the first page of the month
+        tags (lst): list of tags to look for
+        filters (lst): list of filters where to look tags
+        begin_date (str): 8 digits (YYYYMMDD) string with the begin date
+        end_date (str): 8 digits (YYYYMMDD) string with the end date
+        endpoint (str): url of the Article Search API
+        api_key (str): NYT API key
+        manifest (Manifest): manifest where the saved pages are recorded
+        only_missing (bool): if True, skip the pages that the manifest already
+            has as complete
+
+    Return (lst): futures of the scheduled requests
+    """
     # Get number of articles that match our query search parameters
     hits = resp_json["response"]["meta"]["hits"]
 
@@ -107,23 +240,51 @@ def get_json(tags, filters, begin_date, end_date):
     max_pages = int(hits / 10)
 
     # Query everything and save the jsons
+    new_dir = month_dir(begin_date)
+    unit = begin_date[:6]
+    remove_extra_pages(new_dir, max_pages)
+    if manifest is not None:
+        manifest.forget_pages_above("nyt", unit, max_pages)
+
+    futures = []
     for page_n in range(1, max_pages + 1):
         page_str = str(page_n)
-        resp = make_request(tags, filters, begin_date, end_date, page_str)
-        resp_json = json.loads(resp.text)
-        name = "nyt_" + page_str + ".json"
-        file_name = os.path.join(current_dir, "raw_data", year, month_name,
-                                name)
-        
-        with open(file_name, "w") as f:
-            json.dump(resp_json, f, indent=1)
-            f.close()
+        url = create_url(tags, filters, begin_date, end_date, page_str,
+                        endpoint, api_key)
+        file_name = os.path.join(new_dir, "nyt_" + page_str + ".json")
+
+        on_saved = None
+        if manifest is not None:
+            if only_missing and manifest.is_complete("nyt", unit, page_n,
+                                    file_name, url, fresh_after(end_date)):
+                continue
+            on_saved = partial(manifest.record, "nyt", unit, page_n, url = url)
+        futures.append(scheduler.submit(url, file_name, on_saved))
+
+    return futures
+
+
+def remove_extra_pages(month_directory, max_pages):
+    """
+    Remove the JSON files of a month numbered above its current number of
+        pages
+
+    Inputs:
+        month_directory (str): directory with the JSON files of the month
+        max_pages (int): number of the last page of the month
+    """
+    for file_name in os.listdir(month_directory):
+        match = PAGE_FILE_RE.match(file_name)
+        if match and int(match.group(1)) > max_pages:
+            os.remove(os.path.join(month_directory, file_name))
 
 
-def make_request(tags, filters, begin_date, end_date, page = "0"):
+def make_request(tags, filters, begin_date, end_date, page = "0",
+                endpoint = NYT_ENDPOINT, api_key = nyt_api_key, scheduler = None):
     """
-    Make a GET request to the NYT Article Search API with a request delay of 6
-        seconds to avoid reaching request limit of 60 requests per minute.
+    Make a GET request to the NYT Article Search API. The scheduler waits for
+        a token of its bucket to avoid reaching the request limit of 60
+        requests per minute.
 
     Inputs:
         tags (lst): list of tags (strings) to look for. The tags to filter for
@@ -135,18 +296,25 @@ def make_request(tags, filters, begin_date, end_date, page = "0"):
         end_date (str): 8 digits (YYYYMMDD) string that specify the end date or
             until when to stop looking for articles.
         page (str): number of page string that states where to look for articles.
+        endpoint (str): url of the Article Search API
+        api_key (str): NYT API key
+        scheduler (FetchScheduler): scheduler used to send the request. One
+            limited to REQUESTS_PER_MINUTE is created if None.
     
     Return (Response): API request response with specified query parameters
     """
 
-    url = create_url(tags, filters, begin_date, end_date, page)
-    time.sleep(6)
-    resp = requests.get(url)
+    url = create_url(tags, filters, begin_date, end_date, page, endpoint,
+                    api_key)
+    if scheduler is None:
+        with FetchScheduler(REQUESTS_PER_MINUTE, max_workers = 1) as scheduler:
+            return scheduler.get(url)
 
-    return resp
+    return scheduler.get(url)
 
 
-def create_url(tags, filters, begin_date, end_date, page):
+def create_url(tags, filters, begin_date, end_date, page,
+                endpoint = NYT_ENDPOINT, api_key = nyt_api_key):
     """
     Create request url for API based on query search parameters passed to the
         function.
@@ -161,12 +329,13 @@ def create_url(tags, filters, begin_date, end_date, page):
         end_date (str): 8 digits (YYYYMMDD) string that specify the end date or
             until when to stop looking for articles.
         page (str): number of page string that states where to look for articles.
+        endpoint (str): url of the Article Search API
+        api_key (str): NYT API key
 
     Return (str): URL string with query to send request to NYT Article Search 
         API
     """
 
-    endpoint = "https://api.nytimes.com/svc/search/v2/articlesearch.json?" 
     tags_copy = tags[:]
     filters_copy = filters[:]
 
@@ -176,7 +345,7 @@ def create_url(tags, filters, begin_date, end_date, page):
         filters_copy[i] = fil + ":(" + " OR ".join(tags_copy) + ")"
     
     fq = "fq=" + " OR ".join(filters_copy)
-    url = endpoint + fq + "&begin_date=" + begin_date + "&end_date=" + end_date +\
-            "&page=" + page + "&api-key=" + nyt_api_key
+    url = endpoint + "?" + fq + "&begin_date=" + begin_date + "&end_date=" +\
+            end_date + "&page=" + page + "&api-key=" + api_key
 
-    return url
\ No newline at end of file
+    return url
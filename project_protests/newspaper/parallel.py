@@ -0,0 +1,34 @@
+##################################################
+# Task: Parse newspaper pages in parallel        #
+##################################################
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def map_pages(func, pages, workers = None):
+    """
+    Apply a function to every page file, optionally with a pool of processes.
+    Results are always returned in the order of the pages, so the parallel and
+    the serial paths produce exactly the same output.
+
+    Inputs:
+        func (function): module level function that takes a page path
+        pages (lst): paths of the page files
+        workers (int): number of processes to use. None or 1 parses the pages
+            in the current process and 0 uses one process per CPU.
+
+    Return (generator): result of the function for each page
+    """
+    if workers == 0:
+        workers = os.cpu_count()
+
+    if workers is None or workers <= 1 or len(pages) <= 1:
+        for page in pages:
+            yield func(page)
+        return
+
+    chunksize = max(1, len(pages) // (workers * 4))
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        for result in executor.map(func, pages, chunksize = chunksize):
+            yield result
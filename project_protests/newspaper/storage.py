@@ -0,0 +1,170 @@
+##################################################
+# Task: Typed columnar storage of the news data  #
+##################################################
+
+import os
+import pandas as pd
+from project_protests.query_params import query_lst
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+CATEGORY_COLUMNS = ["newspaper", "section", "section_name", "type",
+                    "type_of_material", "category"]
+TAG_COLUMNS = {tag.lower() for tag in query_lst}
+
+
+def columnar_path(csv_path):
+    """
+    Get the path of the Parquet file stored next to a csv file
+
+    Inputs:
+        csv_path (str): path of the csv file
+
+    Return (str): path of the Parquet file
+    """
+    return os.path.splitext(str(csv_path))[0] + ".parquet"
+
+
+def to_columnar(df):
+    """
+    Give the news columns their types: datetime dates, boolean tags (missing
+    when the tag was not looked for in an article) and categorical newspaper,
+    section and type columns. The "NaN" placeholder that the NYT cleaner uses
+    for a missing type or section is stored as a missing value, as in the csv.
+
+    Inputs:
+        df (DataFrame): dataframe with news articles
+
+    Return (DataFrame): typed dataframe
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col == "date":
+            df[col] = pd.to_datetime(df[col])
+        elif col.lower() in TAG_COLUMNS:
+            df[col] = df[col].astype("boolean")
+        elif col in CATEGORY_COLUMNS:
+            df[col] = df[col].mask(df[col] == "NaN").astype("category")
+        elif df[col].dtype == object:
+            df[col] = df[col].astype("string")
+
+    return df
+
+
+def arrow_table(df, schema = None):
+    """
+    Convert a news dataframe into an Arrow table. Dictionary (categorical)
+    columns use 32 bit indices so tables of different batches share a schema.
+
+    Inputs:
+        df (DataFrame): dataframe with news articles
+        schema (Schema): schema to cast the table to
+
+    Return (Table): Arrow table
+    """
+    table = pa.Table.from_pandas(to_columnar(df), preserve_index = False)
+    if schema is None:
+        fields = []
+        for field in table.schema:
+            if pa.types.is_dictionary(field.type):
+                field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+            fields.append(field)
+        schema = pa.schema(fields, metadata = table.schema.metadata)
+
+    return table.cast(schema)
+
+
+def write_columnar(df, csv_path):
+    """
+    Save a news dataframe as a Parquet file next to its csv file. Nothing is
+    written if pyarrow is not installed.
+
+    Inputs:
+        df (DataFrame): dataframe with news articles
+        csv_path (str): path of the csv file with the same data
+    """
+    if pq is None:
+        return
+
+    pq.write_table(arrow_table(df), columnar_path(csv_path))
+
+
+class ColumnarWriter:
+    """
+    Write batches of news articles to a Parquet file one at a time. Empty
+    batches are skipped because they do not carry the types of the columns.
+    It does nothing if pyarrow is not installed.
+    """
+
+    def __init__(self, csv_path):
+        """
+        Inputs:
+            csv_path (str): path of the csv file with the same data
+        """
+        self.path = columnar_path(csv_path)
+        self.tmp_path = self.path + ".tmp"
+        self.writer = None
+        self.empty = None
+
+    def write(self, df):
+        """
+        Inputs:
+            df (DataFrame): batch of news articles
+        """
+        if pq is None:
+            return
+        if len(df) == 0:
+            self.empty = df
+            return
+
+        if self.writer is None:
+            table = arrow_table(df)
+            self.writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        else:
+            table = arrow_table(df, self.writer.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        """
+        Finish the Parquet file and move it into place
+        """
+        if pq is None:
+            return
+        if self.writer is None:
+            if self.empty is None:
+                return
+            pq.write_table(arrow_table(self.empty), self.tmp_path)
+        else:
+            self.writer.close()
+
+        os.replace(self.tmp_path, self.path)
+
+
+def read_news(csv_path, columns = None):
+    """
+    Read news data with only the requested columns. The Parquet file next to
+    the csv is memory mapped when it exists and is at least as recent as the
+    csv, otherwise the csv is parsed.
+
+    Inputs:
+        csv_path (str): path of the csv file
+        columns (lst): columns to read. Every column is read if None.
+
+    Return (DataFrame): dataframe with news articles
+    """
+    parquet_path = columnar_path(csv_path)
+    if pq is not None and os.path.exists(parquet_path) and \
+            os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        table = pq.read_table(parquet_path, columns = columns, memory_map = True)
+        return table.to_pandas()
+
+    df = pd.read_csv(csv_path, usecols = columns)
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"])
+
+    return df
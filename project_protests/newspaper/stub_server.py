@@ -0,0 +1,269 @@
+##################################################
+# Task: Check the fetcher against a local API    #
+##################################################
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from project_protests.newspaper.fetching import FetchScheduler, scheduler_context
+
+
+class StubAPI:
+    """
+    Local HTTP server that stands in for the newspaper APIs. Every GET request
+    is answered with a small JSON page, unless the url contains one of the
+    keys of failures: the statuses of that key are answered first, one per
+    request. A status of 0 closes the connection without answering. The time
+    and url of every request are recorded.
+    Use it as a context manager: the server runs in a thread until the end of
+    the block.
+    """
+
+    def __init__(self, failures = None, retry_after = None):
+        """
+        Inputs:
+            failures (dict): list of statuses to answer first, by part of the
+                url (e.g. {"page=2": [429, 503]})
+            retry_after (str): value of the Retry-After header of the failed
+                responses. The header is not sent if None.
+        """
+        self.failures = {key: list(statuses) for key, statuses in
+                        (failures or {}).items()}
+        self.retry_after = retry_after
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.url = "http://127.0.0.1:{}/".format(self.server.server_port)
+
+    def handler(self):
+        """
+        Create the request handler class of the server
+
+        Return (class): subclass of BaseHTTPRequestHandler
+        """
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status = stub.next_status(self.path)
+                if status == 0:
+                    self.close_connection = True
+                    return
+                if status == 200:
+                    body = json.dumps({"path": self.path,
+                                    "response": {"meta": {"hits": 0},
+                                                "pages": 1}}).encode()
+                else:
+                    body = b"{}"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status != 200 and stub.retry_after is not None:
+                    self.send_header("Retry-After", stub.retry_after)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def next_status(self, path):
+        """
+        Record a request and get the status to answer it with
+
+        Inputs:
+            path (str): path and query of the request
+
+        Return (int): HTTP status
+        """
+        with self.lock:
+            self.requests.append((time.monotonic(), path))
+            for key, statuses in self.failures.items():
+                if key in path and statuses:
+                    return statuses.pop(0)
+
+        return 200
+
+    def count(self, key):
+        """
+        Count the requests whose url contains a string
+
+        Inputs:
+            key (str): part of the url
+
+        Return (int): number of requests
+        """
+        with self.lock:
+            return sum(key in path for _, path in self.requests)
+
+    def __enter__(self):
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check(condition, message):
+    """
+    Raise an error if a check fails
+
+    Inputs:
+        condition (bool): result of the check
+        message (str): description of the failure
+    """
+    if not condition:
+        raise AssertionError(message)
+
+
+def check_retries():
+    """
+    Requests answered with 429 or 5xx are sent again until they succeed,
+    waiting the time of the Retry-After header
+    """
+    with StubAPI({"page=1": [429, 503, 500]}, retry_after = "0") as stub:
+        with FetchScheduler(6000, backoff = 0.01) as scheduler:
+            data = scheduler.get_json(stub.url + "?page=1")
+        check(data["path"] == "/?page=1", "unexpected response {}".format(data))
+        check(stub.count("page=1") == 4,
+            "{} requests instead of 4".format(stub.count("page=1")))
+
+
+def check_connection_errors():
+    """
+    Requests whose connection is closed without an answer are sent again
+    """
+    with StubAPI({"page=1": [0, 0]}) as stub:
+        with FetchScheduler(6000, backoff = 0.01) as scheduler:
+            data = scheduler.get_json(stub.url + "?page=1")
+        check(data["path"] == "/?page=1", "unexpected response {}".format(data))
+        check(stub.count("page=1") == 3,
+            "{} requests instead of 3".format(stub.count("page=1")))
+
+
+def check_retry_limit():
+    """
+    A request that keeps failing raises an error after max_retries retries
+    """
+    with StubAPI({"page=1": [503] * 10}) as stub:
+        with FetchScheduler(6000, max_retries = 2, backoff = 0.01) as scheduler:
+            try:
+                scheduler.get(stub.url + "?page=1")
+                check(False, "no error after the retries")
+            except Exception as error:
+                check("503" in str(error), "unexpected error {}".format(error))
+        check(stub.count("page=1") == 3,
+            "{} requests instead of 3".format(stub.count("page=1")))
+
+
+def check_pacing():
+    """
+    Requests sent by several workers stay under the rate of the bucket
+    """
+    n_requests = 11
+    with StubAPI() as stub:
+        with FetchScheduler(600, burst = 1, max_workers = 4) as scheduler:
+            futures = [scheduler.submit(stub.url + "?page={}".format(page))
+                        for page in range(n_requests)]
+        for future in futures:
+            future.result()
+        times = sorted(start for start, _ in stub.requests)
+    elapsed = times[-1] - times[0]
+    # 10 intervals of 0.1 seconds, with some tolerance for the timer
+    check(elapsed >= 0.9, "{} requests sent in {:.2f} s".format(n_requests, elapsed))
+
+
+def check_burst():
+    """
+    A full bucket sends its burst of requests back to back
+    """
+    with StubAPI() as stub:
+        start = time.monotonic()
+        with FetchScheduler(60, burst = 5, max_workers = 5) as scheduler:
+            for page in range(5):
+                scheduler.submit(stub.url + "?page={}".format(page))
+        elapsed = time.monotonic() - start
+    check(elapsed < 1, "burst of 5 requests took {:.2f} s".format(elapsed))
+
+
+def check_writes():
+    """
+    Responses are saved to their files and on_saved is called once each file
+    is complete
+    """
+    saved = []
+    with tempfile.TemporaryDirectory() as directory, StubAPI() as stub:
+        file_name = os.path.join(directory, "page.json")
+        with FetchScheduler(6000) as scheduler:
+            scheduler.submit(stub.url + "?page=0", file_name, saved.append)
+        with open(file_name) as f:
+            check(json.load(f)["path"] == "/?page=0", "unexpected file content")
+    check(saved == [file_name], "on_saved called with {}".format(saved))
+
+
+def check_cancel():
+    """
+    Leaving the scheduler because of an error cancels the requests that have
+    not started instead of sending them at the rate of the bucket
+    """
+    with StubAPI() as stub:
+        start = time.monotonic()
+        try:
+            with FetchScheduler(60, max_workers = 1) as scheduler:
+                for page in range(10):
+                    scheduler.submit(stub.url + "?page={}".format(page))
+                raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            pass
+        elapsed = time.monotonic() - start
+    check(elapsed < 3, "closing took {:.2f} s".format(elapsed))
+    check(len(stub.requests) < 10, "every request was sent")
+
+
+def check_shared_scheduler():
+    """
+    A scheduler passed by the caller stays open after the collection, while
+    one created by scheduler_context is closed
+    """
+    with StubAPI() as stub:
+        with FetchScheduler(6000) as scheduler:
+            for _ in range(2):
+                with scheduler_context(scheduler, 60) as shared:
+                    shared.get_json(stub.url)
+            check(stub.count("/") == 2, "the shared scheduler was closed")
+
+        with scheduler_context(None, 6000) as owned:
+            owned.get_json(stub.url)
+        try:
+            owned.submit(stub.url)
+            check(False, "the new scheduler was not closed")
+        except RuntimeError:
+            pass
+
+
+CHECKS = {"retries": check_retries,
+            "connection_errors": check_connection_errors,
+            "retry_limit": check_retry_limit,
+            "pacing": check_pacing,
+            "burst": check_burst,
+            "writes": check_writes,
+            "cancel": check_cancel,
+            "shared_scheduler": check_shared_scheduler}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(CHECKS)
+    failed = 0
+    for name in names:
+        try:
+            CHECKS[name]()
+            print("{:<20}ok".format(name))
+        except Exception as error:
+            failed += 1
+            print("{:<20}FAILED: {}".format(name, error))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,51 @@
+##################################################
+# Task: Flag news articles that mention tags     #
+##################################################
+
+import pandas as pd
+
+
+def match_tags(df, tags, filters, case_sensitive = False):
+    """
+    Add one boolean column per tag that is True when the tag appears in any of
+    the filter columns of an article. Each filter column is normalized once
+    and every tag is then matched with a vectorized substring search, instead
+    of looping over the rows of the dataframe.
+
+    Inputs:
+        df (DataFrame): dataframe with the articles' text columns
+        tags (lst): list of tags (strings) to look for
+        filters (lst): list of columns where to look for the tags
+        case_sensitive (bool): if False, tags and columns are lowercased
+            before matching
+
+    Return (DataFrame): same dataframe with a boolean column for each tag
+    """
+    columns = [normalize_column(df[fil], case_sensitive) for fil in filters]
+
+    for tag in tags:
+        term = tag if case_sensitive else tag.lower()
+        found = pd.Series(False, index = df.index)
+        for col in columns:
+            found |= col.str.contains(term, regex = False, na = False)
+        df[tag] = found.astype(bool)
+
+    return df
+
+
+def normalize_column(col, case_sensitive = False):
+    """
+    Prepare a text column for tag matching. Missing values are kept as missing
+    so they never match a tag.
+
+    Inputs:
+        col (Series): column with text to normalize
+        case_sensitive (bool): if False, the column is lowercased
+
+    Return (Series): column with normalized text
+    """
+    col = col.astype("string")
+    if not case_sensitive:
+        col = col.str.lower()
+
+    return col
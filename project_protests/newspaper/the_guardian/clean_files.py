@@ -5,9 +5,14 @@
 import json
 import pandas as pd
 import os 
-from bs4 import BeautifulSoup
 import re
-from project_protests.query_params import query_lst, from_date, to_date
+from project_protests.query_params import query_lst, from_date, to_date, workers
+from project_protests.newspaper.tag_matching import match_tags
+from project_protests.newspaper.parallel import map_pages
+from project_protests.newspaper.the_guardian.html_text import first_paragraph, strip_tags
+from project_protests.newspaper.storage import write_columnar
+
+PAGE_FILE_RE = re.compile(r"^the_guardian_(\d+)\.json$")
 
 
 def open_clean_data(json_file,query_list = query_lst):
@@ -31,17 +36,16 @@ def open_clean_data(json_file,query_list = query_lst):
     df["body"] = df["fields"].apply(lambda x: dict(x)["body"])
     df["standfirst"] = df["fields"].apply(lambda x: dict(x)["standfirst"])
 
-    ###Retrieve first paragraph and remove tags and hrefs
-    df["lead_paragraph"] = df["body"].apply(lambda x: BeautifulSoup(x,"html.parser").p)
-    df = retrieve_text_html(df,["lead_paragraph","standfirst"])
+    ###Retrieve text of the first paragraph and remove tags from the standfirst
+    df["lead_paragraph"] = df["body"].map(first_paragraph)
+    df = retrieve_text_html(df,["standfirst"])
 
     df["date"] = df["date"].astype(str)
     df["date"] = df["date"].str.extract(r"(\d{4}-\d{2}-\d{2})")
     df["date"] = pd.to_datetime(df["date"],format= "%Y/%m/%d")
     
     ##Add dummy variables to identify which tags match
-    for query_term in query_list:
-        df[query_term] = df["headline"].apply(lambda x: query_term in x)
+    df = match_tags(df, query_list, ["headline"], case_sensitive = True)
 
     #Drop unnecesary columns
     df = df.drop(columns = ["sectionName","isHosted", "pillarId","body","fields","apiUrl"])
@@ -72,7 +76,8 @@ def standarized_clean(df,varlist):
 
 def retrieve_text_html(df, varlist):
     """
-    Retrieves the text from an html text by removing tags and hrefs
+    Retrieves the text from an html text by removing tags and hrefs in one
+    compiled pass
     Inputs:
     -df (Dataframe): Dataframed to which the cleaning is going to be applied
     -varlist: List of columns to be cleaned
@@ -80,29 +85,46 @@ def retrieve_text_html(df, varlist):
     Dataframed with cleaned specified columns 
     """
     for var in varlist:
-        df[var] = df[var].astype(str)
-        df[var] = df[var].apply(lambda x: re.sub(r"</?\w>?","",x))
-        df[var] = df[var].apply(lambda x: re.sub(r"href=\S*?>","",x))
+        df[var] = df[var].astype(str).map(strip_tags)
 
     return df
 
-def create_news_csv():
+def list_page_files(json_directory):
+    """
+    List the page files saved by "make_requests" ordered by page number. Pages
+    are found by parsing the file names, so missing pages or other files in
+    the directory do not shift the numbering.
+    Input:
+    - json_directory (str): directory with the json files
+    Return:
+    List of paths of the json files
+    """
+    pages = []
+    for file_name in os.listdir(json_directory):
+        match = PAGE_FILE_RE.match(file_name)
+        if match:
+            pages.append((int(match.group(1)), os.path.join(json_directory, file_name)))
+
+    return [path for _, path in sorted(pages)]
+
+def create_news_csv(workers = workers):
     """
     Create dataframe with all the news information obtained 
-    from the The Guardian API  
+    from the The Guardian API. The pages are cleaned one by one (or in
+    parallel) and concatenated once at the end.
     Inputs:
-    - none, it uses the json_files obtained from the api requests 
+    - workers (int): number of processes used to clean the json files. None
+    or 1 cleans them one after the other.
     Return:
-    -None, it creates compiled csv with results.
+    -None, it creates compiled csv with results and a typed Parquet copy of it.
     """
     current_dir = os.path.dirname(os.path.realpath(__file__))
     json_directory = os.path.join(current_dir, "json_files")
-    df = open_clean_data("{}/the_guardian_1.json".format(json_directory))
-
-    number_of_files = len(os.listdir(json_directory))
+    pages = list_page_files(json_directory)
 
-    for i in range(2, number_of_files + 1):
-        df = pd.concat([df,open_clean_data("{}/the_guardian_{}.json".format(json_directory,i))]
-        ,ignore_index = True)
+    df = pd.concat(list(map_pages(open_clean_data, pages, workers)),
+        ignore_index = True)
 
-    df.to_csv(os.path.join(current_dir, "data/the_guardian_compiled.csv"), index = False)
\ No newline at end of file
+    csv_path = os.path.join(current_dir, "data/the_guardian_compiled.csv")
+    df.to_csv(csv_path, index = False)
+    write_columnar(df, csv_path)
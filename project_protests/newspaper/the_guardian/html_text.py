@@ -0,0 +1,50 @@
+##Task: Extract text from the html fields of The Guardian articles
+
+import html
+import re
+from lxml import etree
+
+TAG_RE = re.compile(r"<[^>]*>")
+CHUNK_SIZE = 2048
+
+
+def first_paragraph(body, chunk_size = CHUNK_SIZE):
+    """
+    Get the text of the first paragraph of an html article body. The body is
+    fed to an lxml pull parser in chunks and parsing stops as soon as the
+    first </p> is found, so the rest of the article is never parsed.
+    Input:
+    - body (str): html body of the article
+    - chunk_size (int): number of characters fed to the parser at a time
+    Return:
+    Text of the first paragraph (str) or None if the body has no paragraph
+    """
+    if not isinstance(body, str):
+        return None
+
+    parser = etree.HTMLPullParser(events = ("end",), tag = "p")
+    for start in range(0, len(body), chunk_size):
+        parser.feed(body[start:start + chunk_size])
+        for _, element in parser.read_events():
+            return "".join(element.itertext())
+
+    parser.close()
+    for _, element in parser.read_events():
+        return "".join(element.itertext())
+
+    return None
+
+
+def strip_tags(text):
+    """
+    Remove html tags from a text with one compiled regex and unescape html
+    entities
+    Input:
+    - text (str): html text
+    Return:
+    Text without tags (str)
+    """
+    if not isinstance(text, str):
+        return text
+
+    return html.unescape(TAG_RE.sub("", text))
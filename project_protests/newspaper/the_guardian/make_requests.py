@@ -1,10 +1,14 @@
 import sys
 import json
 import lxml.html
-import requests
 import urllib.parse
 import os
+from functools import partial
+from concurrent.futures import as_completed
 from project_protests.query_params import query_lst, from_date, to_date
+from project_protests.newspaper.fetching import scheduler_context, cancel_pending
+from project_protests.newspaper.manifest import Manifest, fresh_after
+from project_protests.newspaper.the_guardian.clean_files import list_page_files, PAGE_FILE_RE
 from project_protests.config import the_guardian_api_key
 
 ##Author: JP Martinez
@@ -30,12 +34,19 @@ def create_query_statement(key,list_parameters):
     return query
 
 base_query_list = query_lst
+GUARDIAN_ENDPOINT = "https://content.guardianapis.com/"
+# Quota of a developer key of the Guardian Open Platform: up to 12 calls per
+# second (and 5,000 calls per day)
+REQUESTS_PER_MINUTE = 720
+BURST = 12
+MAX_WORKERS = 8
 
 
-def request_the_guardian(api_key, search = True, query_list = base_query_list, tags_list = None,
- from_date = "2017-01-01", to_date = "2023-01-31",page_size = 50, page = 1):
+def create_url(api_key, search = True, query_list = base_query_list, tags_list = None,
+ from_date = "2017-01-01", to_date = "2023-01-31",page_size = 50, page = 1,
+ endpoint = GUARDIAN_ENDPOINT):
     """
-    Makes a requests for The Guardian API and returns a JSON file
+    Creates the url of a request to The Guardian API
     Inputs:
     -api_key (str): Api key to be used for the request
     -search (Bool): If True, use search
@@ -44,13 +55,14 @@ def request_the_guardian(api_key, search = True, query_list = base_query_list, t
     -from_date(str): Starting date for news retrieve 
     -to_date(str): End date for news retrieve
     - pages (int): The page to retrieve in the results 
+    - endpoint (str): Base url of the API
     Return:
-     Object with response
+     Url of the request (str)
 
     For additional info on documentation, visit: https://open-platform.theguardian.com/documentation/
     """
     #Base for the request
-    main_page = "https://content.guardianapis.com/"
+    main_page = endpoint
 
     #Add parameters to the query
     parameters_list = []
@@ -83,16 +95,25 @@ def request_the_guardian(api_key, search = True, query_list = base_query_list, t
     query_fields_param = "query-fields=headline,standfirst"
     parameters_list.append(query_fields_param)
 
-    #Join sections and request query
+    #Join sections of the query
     full_query = main_page + search_param + "&".join(parameters_list)
-    response = requests.get(full_query)
-    
-    return response
+
+    return full_query
 
 def get_json_files(api_key = the_guardian_api_key, search = True, query_list = query_lst, tags_list = None,
- from_date = from_date, to_date = to_date, page_size = 50, page = 1):
+ from_date = from_date, to_date = to_date, page_size = 50, page = 1,
+ incremental = True, manifest = None, scheduler = None, endpoint = GUARDIAN_ENDPOINT,
+ requests_per_minute = REQUESTS_PER_MINUTE, burst = BURST, max_workers = MAX_WORKERS):
     """
-    Get json files
+    Get json files. The first page gives the number of pages, then the rest of
+    the pages are requested concurrently by the scheduler, which shares one
+    pooled session, keeps the requests under the API quota, retries on 429 and
+    5xx responses and saves every page as soon as it arrives.
+
+    Every saved page is recorded in the collection manifest. In incremental
+    mode the pages that are already saved, unchanged and not stale (fetched
+    before to_date was over) are not requested again, so an interrupted
+    collection picks up where it stopped.
     Inputs:
     -api_key (str): Api key to be used for the request
     -search (Bool): If True, use search
@@ -101,36 +122,81 @@ def get_json_files(api_key = the_guardian_api_key, search = True, query_list = q
     -from_date(str): Starting date for news retrieve 
     -to_date(str): End date for news retrieve
     - page (int): The page to retrieve in the results 
+    - incremental (bool): If False, request every page again
+    - manifest (Manifest): Manifest of the collected pages. The default
+    manifest file is used if None.
+    - scheduler (FetchScheduler): Scheduler used to send the requests. It is
+    left open so it can be shared with other calls. One with the following
+    rate, burst and workers is created and closed if None.
+    - endpoint (str): Base url of the API
+    - requests_per_minute (float): Request quota of the api key
+    - burst (int): Number of requests that can be sent back to back
+    - max_workers (int): Number of requests waiting for a response at the
+    same time
     Return:
      None - it creates json-files for each of the pages in the request results
     """
-    #Make request and do json transformations
-    response = request_the_guardian(api_key,search, query_list, tags_list,
-    from_date,to_date,page_size,page)
-
-    response_json = json.loads(response.text)
-    #Get number of pages to determine the number of requests to make
-    n_pages = response_json["response"]["pages"]
-
     current_dir = os.path.dirname(os.path.realpath(__file__))
     json_files = os.path.join(current_dir, "json_files")
 
-    with open("{}/the_guardian_1.json".format(json_files), "w") as f:
-        json.dump(response_json, f, indent=1)
-        f.close()
-    print("saved page n° 1/{}".format(n_pages))
-
-    for pag in range(2,n_pages+1):
-        response = request_the_guardian(api_key, search, query_list,tags_list,
-    from_date,to_date,page_size,pag)
-        response_json = json.loads(response.text)
-        print("saved page n° {}/{}".format(pag,n_pages))
-        
-        with open("{}/the_guardian_{}.json".format(json_files,pag),"w") as f:
-            json.dump(response_json,f,indent=1)
-            f.close()
-
-
-
-
-
+    if manifest is None:
+        manifest = Manifest()
+    if not incremental:
+        manifest.reset("the_guardian")
+    unit = from_date + "_" + to_date
+    fresh_time = fresh_after(to_date)
+    get_url = partial(create_url, api_key, search, query_list, tags_list,
+    from_date, to_date, page_size, endpoint = endpoint)
+
+    with scheduler_context(scheduler, requests_per_minute, burst,
+    max_workers) as scheduler:
+        #Make request and do json transformations, unless the first page is saved
+        url = get_url(page)
+        file_name = "{}/the_guardian_{}.json".format(json_files, page)
+        first_page_saved = manifest.is_complete("the_guardian", unit, page,
+        file_name, url, fresh_time)
+        if first_page_saved:
+            with open(file_name) as f:
+                response_json = json.load(f)
+        else:
+            on_saved = partial(manifest.record, "the_guardian", unit, page, url = url)
+            response_json = scheduler.get_json(url, file_name, on_saved)
+
+        #Get number of pages to determine the number of requests to make
+        n_pages = response_json["response"]["pages"]
+        print("saved page n° {}/{}".format(page, n_pages))
+        remove_extra_pages(json_files, n_pages)
+        manifest.forget_pages_above("the_guardian", unit, n_pages)
+
+        futures = {}
+        try:
+            for pag in range(page + 1, n_pages + 1):
+                url = get_url(pag)
+                file_name = "{}/the_guardian_{}.json".format(json_files, pag)
+                if first_page_saved and manifest.is_complete("the_guardian", unit,
+                pag, file_name, url, fresh_time):
+                    continue
+
+                on_saved = partial(manifest.record, "the_guardian", unit, pag, url = url)
+                futures[scheduler.submit(url, file_name, on_saved)] = pag
+
+            for future in as_completed(futures):
+                future.result()
+                print("saved page n° {}/{}".format(futures[future], n_pages))
+        except BaseException:
+            #Do not wait for the rest of the pages at the API rate
+            cancel_pending(futures)
+            raise
+
+def remove_extra_pages(json_directory, n_pages):
+    """
+    Remove page files numbered above the number of pages of the current
+    results, left by a previous collection with more results
+    Inputs:
+    - json_directory (str): directory with the json files
+    - n_pages (int): number of pages of the results
+    """
+    for file_path in list_page_files(json_directory):
+        match = PAGE_FILE_RE.match(os.path.basename(file_path))
+        if int(match.group(1)) > n_pages:
+            os.remove(file_path)
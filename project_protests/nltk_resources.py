@@ -0,0 +1,93 @@
+##################################################
+# Task: Load NLTK resources on first use         #
+##################################################
+
+import threading
+import nltk
+
+RESOURCES = {"vader_lexicon": "sentiment/vader_lexicon.zip",
+            "stopwords": "corpora/stopwords",
+            "punkt": "tokenizers/punkt",
+            "punkt_tab": "tokenizers/punkt_tab"}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def ensure_resource(name):
+    """
+    Make sure an NLTK resource is available. It is only downloaded when it
+    cannot be found locally.
+
+    Inputs:
+        name (str): name of the resource (a key of RESOURCES)
+
+    Return (str): path of the resource
+    """
+    try:
+        return nltk.data.find(RESOURCES[name])
+    except LookupError:
+        nltk.download(name, quiet = True)
+
+    # raises a LookupError explaining how to install the resource
+    return nltk.data.find(RESOURCES[name])
+
+
+def cached(name, build):
+    """
+    Build a resource once per process
+
+    Inputs:
+        name (str): name of the resource in the cache
+        build (function): function without arguments that builds it
+
+    Return: the resource
+    """
+    with _lock:
+        if name not in _cache:
+            _cache[name] = build()
+
+        return _cache[name]
+
+
+def sentiment_analyzer():
+    """
+    Get the VADER sentiment analyzer of the process, loading its lexicon on
+    first use
+
+    Return (SentimentIntensityAnalyzer): sentiment analyzer
+    """
+    def build():
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        ensure_resource("vader_lexicon")
+        return SentimentIntensityAnalyzer()
+
+    return cached("sentiment_analyzer", build)
+
+
+def stop_words(language = "english"):
+    """
+    Get the NLTK stop words of a language, loading the corpus on first use
+
+    Inputs:
+        language (str): language of the stop words
+
+    Return (lst): stop words
+    """
+    def build():
+        from nltk.corpus import stopwords
+        ensure_resource("stopwords")
+        return stopwords.words(language)
+
+    return cached("stop_words_" + language, build)
+
+
+def sentence_tokenizer_resource():
+    """
+    Make sure the Punkt sentence tokenizer used by nltk.sent_tokenize is
+    available. Recent NLTK versions read it from punkt_tab instead of punkt.
+    """
+    if hasattr(nltk.tokenize, "PunktTokenizer"):
+        ensure_resource("punkt_tab")
+    else:
+        ensure_resource("punkt")
@@ -6,14 +6,24 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from project_protests import data_access
+
+budget_filepath = pathlib.Path(__file__).parent / "police_budget_by_city.csv"
 
 def load_budget_data():
     """"
-    Function to create dataframe from CSV
+    Function to create dataframe from CSV. The data is loaded once per process.
     
+    Return: Pandas DataFrame (shared, do not modify its values in place)
+    """
+    return data_access.load(budget_filepath, read_budget_data)
+
+def read_budget_data(budget_filepath):
+    """
+    Function to read and prepare the budget data
+
     Return: Pandas DataFrame
     """
-    budget_filepath = pathlib.Path(__file__).parent / "police_budget_by_city.csv"
     budget_df = pd.DataFrame(pd.read_csv(budget_filepath), 
         columns= ['City','Type','FY16', 'FY17', 'FY18', 'FY19', 'FY20', 'FY21', 'FY22', 'FY23'])
     budget_df.dropna(axis=0, how='all', inplace=True)
@@ -0,0 +1,52 @@
+# Task: classify the claims of the protests by the terms they mention
+import re
+import pandas as pd
+
+# terms of the claims of protests related to Black Lives Matter and police
+CLAIM_TERMS = ['police', 'black lives', 'racial justice', 'criminal justice', 'racism', 'white supremacy']
+_patterns = {}
+
+def claim_pattern(terms):
+    '''
+    This function compiles, once per set of terms, a regex that finds every
+    term in a text. The lookahead makes matches overlap and longer terms are
+    tried first, so a term is only missed when a longer term that contains
+    it starts at the same position.
+    Input: terms (tuple of lowercase strings)
+    Output: compiled regex
+    '''
+    if terms not in _patterns:
+        alternatives = '|'.join(re.escape(term) for term in
+                                sorted(terms, key=len, reverse=True))
+        _patterns[terms] = re.compile('(?=(' + alternatives + '))')
+    return _patterns[terms]
+
+def claim_column(term):
+    '''
+    This function names the column of a term in the claim matrix.
+    Input: term (string)
+    Output: column name (string)
+    '''
+    return 'claim_' + term.replace(' ', '_')
+
+def classify_claims(claims, terms=CLAIM_TERMS):
+    '''
+    This function finds which terms each claim mentions, ignoring case, with
+    a single pass of the compiled regex over the claims.
+    Input: claims (series of strings, missing values mention no term),
+    terms (list of strings)
+    Output: dataframe with one boolean column per term (see claim_column)
+    and the index of the claims
+    '''
+    terms = [term.lower() for term in terms]
+    found = claims.fillna('').str.lower().str.findall(claim_pattern(tuple(terms)))
+    matches = found.explode().dropna()
+    matched = pd.get_dummies(matches).groupby(level=0).any()
+    matched = matched.reindex(index=claims.index, columns=terms, fill_value=False)
+
+    matrix = pd.DataFrame(index=claims.index)
+    for term in terms:
+        # a match of a longer term also counts for the terms it contains
+        containing = [other for other in terms if term in other]
+        matrix[claim_column(term)] = matched[containing].any(axis=1)
+    return matrix
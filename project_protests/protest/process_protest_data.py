@@ -1,106 +1,257 @@
 # Task: load and clean protest data from Crowd Consortium
 # Author: Monica Nimmagadda
 import os
+import json
 import pandas as pd
-import glob
-from itertools import chain
 import numpy as np
 import pathlib
+from project_protests import data_access
+from project_protests.newspaper.parallel import map_pages
+from project_protests.newspaper.storage import columnar_path
+from project_protests.query_params import workers
+from project_protests.protest.claim_classifier import classify_claims, claim_column, CLAIM_TERMS
 
-def process_protest_data():
-    '''
-    This function processes all of the protest data from the Crowd Consortium
-    for protests between Jan 2017 and Jan 2023.
-    '''
-    filename = pathlib.Path(__file__).parent / "data"
-    dir = list(filename.iterdir())
-    li = []
-    for item in dir:
-        file = pd.read_csv(item)
-        li.append(file)
-    
-    df = (pd.concat(li, axis=0, ignore_index=True)).fillna('')
-    # combine columns and drop old columns
-    df = combine_and_drop_cols(df, 'EstimateLow', 'size_low', 'Estimate_Low')
-    df = combine_and_drop_cols(df, 'EstimateHigh', 'size_high', 'Estimate_High')
-    df = combine_and_drop_cols(df, 'Claim', 'claims', 'Claim Description')
-
-    df['CityTown'] = df['CityTown'].replace('nan', '')
-    df['City/Town'] = df['City/Town'].replace('nan', '')
-    df['CityTown'].fillna('')
-    df['City/Town'].fillna('')
-    df = combine_and_drop_cols(df, 'CityTown', 'City/Town', 'City_Town')
-
-    #remove Source columns with different names
-    for i in range(1,31):
-        if i < 18:
-            name_concat_cap = 'Source'+str(i)
-            name_concat_lower = 'source'+str(i)
-            df = df.drop(name_concat_cap, axis=1)
-            df = df.drop(name_concat_lower, axis=1)
-        else:
-            name_concat_lower = 'source'+str(i)
-            df = df.drop(name_concat_lower, axis=1)
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
-    # remove unnamed cols
-    unnamed_merge = chain(range(1,6), range(25, 45))
-    for it in unnamed_merge:
-        name_concat = 'Unnamed:' + " " + str(it)
-        df = df.drop(name_concat, axis=1)
+protest_dir = pathlib.Path(__file__).parent
+data_dir = protest_dir / "data"
+store_dir = protest_dir / "store"
+police_filepath = protest_dir / "police-data.csv"
+cube_filepath = protest_dir / "police-cube.csv"
+# version of the cleaning: partitions cleaned by another version are redone
+STORE_VERSION = 2
 
+# canonical columns of the cleaned data and the names each one has in the
+# different versions of the monthly sheets, in order of preference
+PROTEST_COLUMNS = {
+    'City_Town': ['CityTown', 'City/Town', 'City', 'locality'],
+    'Location': ['Location', 'location'],
+    'County': ['County'],
+    'StateTerritory': ['StateTerritory', 'state'],
+    'Date': ['Date', 'date'],
+    'Estimate_Low': ['EstimateLow', 'size_low'],
+    'Estimate_High': ['EstimateHigh', 'size_high'],
+    'Claim Description': ['Claim', 'claims'],
+}
+ALIASES = {alias for aliases in PROTEST_COLUMNS.values() for alias in aliases}
+SIZE_COLUMNS = ['Estimate_Low', 'Estimate_High']
+CATEGORY_COLUMNS = ['City_Town', 'County', 'StateTerritory']
+CUBE_DIMENSIONS = ['Year', 'Month', 'StateTerritory', 'City_Town']
 
-    # fill null values with another column value
-    df = fill_null_another_col(df, 'City_Town', 'locality')
-    df = fill_null_another_col(df, 'Date', 'date')
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d')
-    df = fill_null_another_col(df, 'StateTerritory', 'state')
+def process_protest_data(workers=workers, incremental=True):
+    '''
+    This function processes all of the protest data from the Crowd Consortium
+    for protests between Jan 2017 and Jan 2023 and saves it in
+    police-data.csv, in this directory. Each monthly file is cleaned into its
+    own partition of the store directory with the hash of the file, so only
+    new files and files whose content changed (e.g. a re-published month)
+    are cleaned again.
+    Input: workers (int) - number of processes cleaning the files (None or 1
+    cleans them in this process, 0 uses one process per CPU), incremental
+    (bool) - if False, every file is cleaned again
+    '''
+    files = sorted(data_dir.iterdir())
+    manifest = read_store_manifest() if incremental else {}
+    hashes = {file.name: data_access.file_hash(file) for file in files}
+    stale = [file for file in files if
+            manifest.get(file.name, {}).get("sha256") != hashes[file.name] or
+            not (store_dir / file.name).exists()]
 
+    os.makedirs(store_dir, exist_ok=True)
+    for file, partition in zip(stale, map_pages(clean_protest_file, stale, workers)):
+        partition.to_csv(store_dir / file.name, index=False)
+        manifest[file.name] = {"sha256": hashes[file.name], "rows": len(partition)}
+        write_store_manifest(manifest)
 
-    cols_to_drop = ['Pro(2)/Anti(1)', 'locality', 'ReportedArrests', 'ReportedParticipantInjuries', 'TownsCities', 'ReportedPoliceInjuries', 'ReportedPropertyDamage', 'Misc.','date', 'state', 'valence', 'notes', 'coder', 'Pro2Anti1','TearGas','protest','Crowd Counting Consortium', 'S1', 'S2', 'Pro2-Anti1', 'CountLove', 'AdHoc', 'Misc']
-    df = drop_multiple_cols(df, cols_to_drop)
+    # forget the partitions of files that were removed
+    for name in set(manifest) - set(hashes):
+        if (store_dir / name).exists():
+            os.remove(store_dir / name)
+        del manifest[name]
+    write_store_manifest(manifest)
+    print("Cleaned {} of {} monthly protest files".format(len(stale), len(files)))
 
-    # filter protests to related to Black Lives Matter and police
-    police_terms = ['police', 'black lives', 'racial justice', 'criminal justice', 'racism', 'white supremacy']
-    police_df = df[df['Claim Description'].str.contains('|'.join(police_terms))]
-    
-    # final output
-    police_df.to_csv("police-data.csv")
+    police_df = pd.concat([read_partition(store_dir / file.name) for file in files],
+                          ignore_index=True)
+    police_df = to_typed(police_df)
+    police_df.to_csv(police_filepath, index=False)
+    if pq is not None:
+        police_df.to_parquet(columnar_path(police_filepath), index=False)
+    write_protest_cube(police_df)
     return None
 
-def combine_and_drop_cols(df, col_1, col_2, new_col):
+def build_protest_cube(df):
     '''
-    This function combines columns of differently named columns between the sheets
-    that have the same value. It also drops the old columns.
-    Input: dataframe, col_1 and col_2 to combine, new_col to create
-    Output: dataframe (changed in place)
+    This function aggregates the protests by year, month, state and city:
+    the number of protests and the sums of their crowd size estimates.
+    Protests without a state or city keep a missing value in the cube, so
+    rollups over the other dimensions still count them.
+    Input: typed dataframe with protests
+    Output: dataframe with one row per (year, month, state, city)
     '''
-    df[new_col] = df[col_1].astype(str) + df[col_2].astype(str)
-    if col_1 == 'EstimateHigh' or col_1 == 'EstimateLow':
-        pd.to_numeric(df[new_col], errors='coerce')
-    df = df.drop(col_2, axis=1)
-    df = df.drop(col_1, axis=1)
-    return df
+    keys = pd.DataFrame({'Year': df['Date'].dt.year,
+                         'Month': df['Date'].dt.month,
+                         'StateTerritory': df['StateTerritory'].astype(object),
+                         'City_Town': df['City_Town'].astype(object)})
+    sizes = df[SIZE_COLUMNS].assign(Count=1)
+    cube = sizes.groupby([keys[col] for col in CUBE_DIMENSIONS], dropna=False).sum()
+    return cube[['Count'] + SIZE_COLUMNS].reset_index()
+
+def write_protest_cube(df, path=cube_filepath):
+    '''
+    This function saves the aggregate cube of the protests. It is written to
+    a temporary file first and moved into place, so readers (e.g. other
+    dashboard workers) never see a partly written cube.
+    Input: typed dataframe with protests, path of the cube csv
+    '''
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    build_protest_cube(df).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
 
-def drop_multiple_cols(df, cols_to_drop):
+def read_protest_cube(path=cube_filepath):
+    '''
+    This function reads the aggregate cube of the protests.
+    Input: path of the cube csv
+    Output: dataframe with one row per (year, month, state, city)
     '''
-    This function drops columns that are in the passed in list.
-    Input: dataframe, cols_to_drop (list)
-    Output: dataframe (changed in place)
+    dtypes = {'StateTerritory': 'category', 'City_Town': 'category'}
+    dtypes.update({col: 'Int64' for col in SIZE_COLUMNS})
+    return pd.read_csv(path, dtype=dtypes)
+
+def to_typed(df):
+    '''
+    This function gives the protest columns compact types: datetime dates,
+    nullable integer crowd sizes, categorical places and boolean claim terms.
+    Input: dataframe with protests
+    Output: typed dataframe
     '''
-    final_columns = []
     for col in df.columns:
-        if col not in cols_to_drop:
-            final_columns.append(col)
-    df.drop(columns=df.columns.difference(final_columns), inplace=True)
+        if col == 'Date':
+            df[col] = pd.to_datetime(df[col])
+        elif col in SIZE_COLUMNS:
+            df[col] = df[col].astype('Int64')
+        elif col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif col.startswith('claim_'):
+            df[col] = df[col].astype(bool)
+        else:
+            df[col] = df[col].astype('string')
     return df
 
-def fill_null_another_col(df, col, fill_col):
+def read_protests(path=police_filepath, columns=None):
     '''
-    This function fills null values of one col, with values of the given col
-    Input: dataframe, col, fill_col
-    Output: dataframe (changed in place)
+    This function reads the cleaned protests with their types. The Parquet
+    file next to the csv is used when it exists and is at least as recent as
+    the csv, otherwise the csv is parsed.
+    Input: path of the csv file, columns (list) - columns to read, every
+    column if None
+    Output: typed dataframe
     '''
-    df[col] = df[col].replace(r'^\s*$', np.nan, regex=True)
-    df[col] = df[col].fillna(df[fill_col])
-    return df
+    parquet_path = columnar_path(path)
+    if pq is not None and os.path.exists(parquet_path) and \
+            os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+        return pq.read_table(parquet_path, columns=columns, memory_map=True).to_pandas()
+
+    df = pd.read_csv(path, usecols=columns,
+                     dtype={col: 'Int64' for col in SIZE_COLUMNS})
+    return to_typed(df)
+
+def read_store_manifest():
+    '''
+    This function reads the hash and number of rows of the partition of each
+    monthly file. Partitions of another version of the cleaning are ignored.
+    Output: dictionary by file name
+    '''
+    manifest_path = store_dir / "manifest.json"
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != STORE_VERSION:
+        return {}
+    return manifest["files"]
 
+def write_store_manifest(manifest):
+    '''
+    This function saves the hash and number of rows of each partition.
+    Input: manifest (dict) - entry of each monthly file by file name
+    '''
+    manifest_path = store_dir / "manifest.json"
+    with open(str(manifest_path) + ".tmp", "w") as f:
+        json.dump({"version": STORE_VERSION, "files": manifest}, f, indent=1)
+    os.replace(str(manifest_path) + ".tmp", manifest_path)
+
+def read_partition(path):
+    '''
+    This function reads the cleaned protests of one monthly file.
+    Input: path of the partition
+    Output: dataframe
+    '''
+    dtypes = {col: str for col in PROTEST_COLUMNS}
+    dtypes.update({col: 'Int64' for col in SIZE_COLUMNS})
+    return pd.read_csv(path, dtype=dtypes)
+
+def clean_protest_file(path):
+    '''
+    This function cleans one monthly file: it parses the dates and crowd
+    sizes and keeps the protests related to Black Lives Matter and police, with the terms each
+    claim mentions.
+    Input: path of the csv file
+    Output: dataframe (empty if the file has no claims column)
+    '''
+    df = load_protest_file(path)
+    if df is None:
+        return pd.DataFrame(columns=list(PROTEST_COLUMNS) +
+                            [claim_column(term) for term in CLAIM_TERMS])
+
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d')
+    for col in SIZE_COLUMNS:
+        df[col] = parse_size(df[col])
+    claims = classify_claims(df['Claim Description'])
+    return pd.concat([df, claims], axis=1)[claims.any(axis=1)]
+
+def load_protest_file(path):
+    '''
+    This function reads the columns of one monthly file that map to the
+    canonical protest columns, as text, and renames them.
+    Input: path of the csv file
+    Output: dataframe with the canonical columns, or None if the file has
+    no claims column
+    '''
+    df = pd.read_csv(path, usecols=lambda col: col in ALIASES, dtype=str)
+    if not any(alias in df.columns for alias in PROTEST_COLUMNS['Claim Description']):
+        return None
+
+    # blank cells are missing values
+    df = df.replace(r'^\s*$', np.nan, regex=True)
+    protest_df = pd.DataFrame(index=df.index)
+    for col, aliases in PROTEST_COLUMNS.items():
+        protest_df[col] = coalesce(df, aliases)
+    return protest_df
+
+def parse_size(col):
+    '''
+    This function converts crowd size estimates written as text (e.g. "1,000")
+    into integers. Estimates that are not numbers are missing.
+    Input: series of strings
+    Output: series of nullable integers
+    '''
+    sizes = pd.to_numeric(col.astype('string').str.replace(',', '', regex=False),
+                          errors='coerce')
+    return sizes.round().astype('Int64')
+
+def coalesce(df, cols):
+    '''
+    This function combines the columns of a file that hold the same value,
+    taking the first one that is not missing.
+    Input: dataframe, cols (list) - columns in order of preference
+    Output: series (missing if none of the columns is in the dataframe)
+    '''
+    values = pd.Series(np.nan, index=df.index, dtype=object)
+    for col in cols:
+        if col in df.columns:
+            values = values.fillna(df[col])
+    return values
@@ -8,3 +8,4 @@ to_date = "2023-01-31"
 page_size = 50
 page = 1
 filters_lst = ["headline", "lead_paragraph"]
+workers = 1
@@ -1,66 +1,338 @@
 # Author: Monica Nimmagadda
 # Task: pairwise correlation for a given term and dataset
 import pandas as pandas
-import re  
-import nltk
-nltk.download([
-"punkt", "stopwords"
-])  
-from nltk.corpus import stopwords  
+import os
+import json
+import hashlib
+import threading
+import contextlib
 import numpy as np
 from gensim.models import Word2Vec  
 import pathlib
 import pandas as pd
+from project_protests.newspaper.storage import read_news
+from project_protests import data_access
+from project_protests.query_params import from_date, to_date
+from project_protests.sentiment_analysis.text_processing import ArticleCorpus, TOKENIZER_VERSION
 
-def word_similarity(term):
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+compiled_filepath = pathlib.Path(__file__).parent.parent / "newspaper/news_compiled.csv"
+models_dir = pathlib.Path(__file__).parent / "models"
+_models = {}
+_models_lock = threading.Lock()
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def word2vec_params(year):
     '''
-    This function reads news data, calls the clean function, and creates a 
-    Word2Vec model for each year of data as it relates to police and 
-    Black Lives Matter. The function then creates a visualization of the combined
-    data.
+    Hyperparameters of the Word2Vec model of a year. 2017 has fewer articles
+    so words need fewer occurrences to be part of the vocabulary.
 
-    Input: term (string) - the term we are looking for similarity
-    Output: 2x3 chart with top 10 words per year and their corresponding
-    similarity score
+    Input: year (int)
+    Output: dictionary with the keyword arguments of Word2Vec
     '''
-    compiled_filepath = pathlib.Path(__file__).parent.parent / "newspaper/news_compiled.csv"
-    df = pd.read_csv(compiled_filepath)
-    df['year'] = pd.DatetimeIndex(df['date']).year
-    years = sorted(df['year'].unique())
-    visualization_df = []
-    for year in years:
-        articles_text = df.loc[df['year']==year]['lead_paragraph'].str.cat(sep=' ')
-        text = clean(articles_text)
-        if year == 2017:
-            word2vec = Word2Vec(text, min_count = 3, window=5)
-        elif year == 2023:
-            continue
-        else:
-            word2vec = Word2Vec(text, min_count = 10, window=5)
-        similar_words = word2vec.wv.most_similar(positive=[term], topn=15)
-        for word, score in similar_words:
-            visualization_df.append((word, score, year))
-    
-    return visualization_df
+    if year == 2017:
+        return {"min_count": 3, "window": 5}
+
+    return {"min_count": 10, "window": 5}
+
+def model_version(years=range(int(from_date[:4]), int(to_date[:4]))):
+    '''
+    Identify the version of the Word2Vec models by hashing the version of the
+    tokenizer and the hyperparameters of every year, so anything built from
+    the models can tell when they are trained again.
+
+    Input: years (iterable of ints) - years with a model
+    Output: short hexadecimal hash
+    '''
+    settings = {"tokenizer": TOKENIZER_VERSION,
+                "params": {str(year): word2vec_params(year) for year in years}}
+
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+def article_hashes(texts):
+    '''
+    Hash the text of every article, so new articles can be told apart from
+    the ones a model was already trained on.
+
+    Input: texts (list of strings)
+    Output: list of hexadecimal hashes
+    '''
+    return [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+
+def model_path(year):
+    '''
+    Path where the Word2Vec model of a year is saved, with the path of the
+    json file that describes the corpus and hyperparameters it was trained on.
+
+    Input: year (int)
+    Output: tuple with the model path and the info path
+    '''
+    name = "word2vec_{}".format(year)
+
+    return models_dir / (name + ".model"), models_dir / (name + ".json")
+
+def index_path(year):
+    '''
+    Path of the normalized embedding matrix of a year and of the list of words
+    of its rows.
+
+    Input: year (int)
+    Output: tuple with the matrix path and the words path
+    '''
+    name = "word2vec_{}".format(year)
+
+    return models_dir / (name + ".vectors.npy"), models_dir / (name + ".words.json")
+
+def temp_path(path):
+    '''
+    Path where a file of the models directory is written before it replaces
+    the file at path, unique to the process.
+
+    Input: path (pathlib.Path)
+    Output: pathlib.Path
+    '''
+    return path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+
+@contextlib.contextmanager
+def year_lock(year):
+    '''
+    Hold an exclusive lock on the files of a year's model across processes
+    (e.g. gunicorn workers), so only one of them trains and writes the model
+    and the others load it. Where fcntl is not available the lock only
+    applies within the process, through _models_lock.
+
+    Input: year (int)
+    '''
+    os.makedirs(models_dir, exist_ok=True)
+    with open(models_dir / "word2vec_{}.lock".format(year), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+def save_model(year, model, info):
+    '''
+    Save a model and its index. Every file is written under a temporary name
+    and moved into place, so processes that memory map the previous files
+    keep reading them unchanged. The info file is removed first and written
+    last: a model interrupted while saving is trained again.
+
+    Input: year (int), model (Word2Vec), info (dict) - description of the
+    corpus and hyperparameters of the model
+    Output: None, the files are saved in the models directory
+    '''
+    path, info_path = model_path(year)
+    if info_path.exists():
+        os.remove(info_path)
+
+    # gensim saves the arrays next to the model, with names that start with
+    # the name of the model file
+    tmp_path = temp_path(path)
+    model.save(str(tmp_path), sep_limit=0)
+    for tmp_file in models_dir.glob(tmp_path.name + "*"):
+        os.replace(tmp_file, models_dir / (path.name + tmp_file.name[len(tmp_path.name):]))
+    save_index(year, model)
+
+    with open(temp_path(info_path), "w") as f:
+        json.dump(info, f)
+    os.replace(temp_path(info_path), info_path)
+
+def save_index(year, model):
+    '''
+    Save the word vectors of a model normalized to unit length, so the
+    similarity of a term with every word is a single matrix product. The
+    files are written under temporary names and moved into place.
+
+    Input: year (int), model (Word2Vec)
+    Output: None, the matrix and its words are saved in the models directory
+    '''
+    vectors_path, words_path = index_path(year)
+    with open(temp_path(vectors_path), "wb") as f:
+        np.save(f, model.wv.get_normed_vectors().astype(np.float32))
+    with open(temp_path(words_path), "w") as f:
+        json.dump(list(model.wv.index_to_key), f)
+    os.replace(temp_path(vectors_path), vectors_path)
+    os.replace(temp_path(words_path), words_path)
+
+def load_index(year):
+    '''
+    Memory map the normalized embedding matrix of a year.
+
+    Input: year (int)
+    Output: dictionary with the words, the position of each word and the
+    matrix of normalized vectors
+    '''
+    vectors_path, words_path = index_path(year)
+    with open(words_path) as f:
+        words = json.load(f)
+
+    return {"words": words, "positions": {word: i for i, word in enumerate(words)},
+            "vectors": np.load(vectors_path, mmap_mode="r")}
+
+def train_model(texts, params):
+    '''
+    Train a Word2Vec model on the articles, each article being a sentence
+    tokenized as the model reads it.
+
+    Input: texts (list of strings), params (dict) - Word2Vec hyperparameters
+    Output: Word2Vec model
+    '''
+    return Word2Vec(ArticleCorpus(texts), **params)
+
+def update_model(model, texts):
+    '''
+    Continue the training of a Word2Vec model with new articles, adding
+    their words to the vocabulary.
+
+    Input: model (Word2Vec), texts (list of strings) - new articles
+    Output: None, the model is updated
+    '''
+    corpus = ArticleCorpus(texts)
+    model.build_vocab(corpus, update=True)
+    model.train(corpus, total_examples=len(corpus), epochs=model.epochs)
 
-def clean(text):
+def year_model(year, texts):
     '''
-    This function cleans the leading paragraph text from the news articles passed in.
-    It also removes english stop words as defined by NLTK and adds in common
-    meaningless words.
+    Get the Word2Vec model of a year. Models are saved in the models
+    directory with the hash of their corpus, their hyperparameters and the
+    version of the tokenizer:
+    a model whose corpus and hyperparameters are unchanged is memory mapped
+    from disk, a model whose corpus only gained articles is trained on the
+    new articles, and any other model is trained again from scratch. The
+    model of the current corpus of each year is also kept in memory.
+
+    Input: year (int), texts (list of strings) - lead paragraphs of the year
+    Output: Word2Vec model
+    '''
+    params = word2vec_params(year)
+    hashes = article_hashes(texts)
+    corpus = hashlib.sha256("".join(hashes).encode()).hexdigest()
+    key = (year, corpus, json.dumps(params, sort_keys=True))
+
+    with _models_lock:
+        if key in _models:
+            return _models[key]
+
+        with year_lock(year):
+            model = load_or_train(year, texts, params, hashes, corpus)
+        # only the model of the current corpus of a year is kept
+        for old_key in [old_key for old_key in _models if old_key[0] == year]:
+            del _models[old_key]
+        _models[key] = model
+
+    return model
+
+def load_or_train(year, texts, params, hashes, corpus):
+    '''
+    Load the saved model of a year if it was trained on the same corpus,
+    otherwise update or train it and save it (see year_model).
+
+    Input: year (int), texts (list of strings), params (dict) - Word2Vec
+    hyperparameters, hashes (list) - hash of each text, corpus (string) -
+    hash of the corpus
+    Output: Word2Vec model
     '''
-    text = text.lower()
-    text = re.sub('[^a-zA-Z]', ' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    # splits a paragraph into sentences
-    sentences = nltk.sent_tokenize(text)
-    # splits a sentence into words
-    words = [nltk.word_tokenize(sent) for sent in sentences]
-    # removes stop words
-    additional_stop_words = ['way', 'come', 'came', 'new', 'york', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'often', 'accross', 'knows', 'known', 'weeks', 'would', 'should', 'still', 'more', 'many', 'know', 'said', 'says', 'also', 'want', 'make', 'one', 'two', 'four', 'three', 'took', 'already', 'may', 'look', 'who', 'whose', 'get', 'take', 'like', 'including', 'include', 'more', 'much', 'first', 'week', 'day', 'recently','year','years']
-    stop_words = stopwords.words('english') + additional_stop_words
-    for i in range(len(words)):
-        words[i] = [w for w in words[i] if w not in stop_words and len(w) > 2]
-    return  words
+    path, info_path = model_path(year)
+    info = None
+    if path.exists() and info_path.exists():
+        with open(info_path) as f:
+            info = json.load(f)
+    if info is not None and (info["params"] != params or
+            info.get("tokenizer") != TOKENIZER_VERSION):
+        info = None
 
+    if info is not None and info["corpus"] == corpus:
+        model = Word2Vec.load(str(path), mmap="r")
+        if not all(index_file.exists() for index_file in index_path(year)):
+            save_index(year, model)
+        return model
 
+    trained = set(info["articles"]) if info is not None else set()
+    if info is not None and trained.issubset(hashes):
+        model = Word2Vec.load(str(path))
+        new_texts = [text for text, text_hash in zip(texts, hashes)
+                    if text_hash not in trained]
+        if new_texts:
+            update_model(model, new_texts)
+    else:
+        model = train_model(texts, params)
+    save_model(year, model, {"year": int(year), "corpus": corpus,
+                "params": params, "tokenizer": TOKENIZER_VERSION,
+                "articles": hashes})
+
+    return model
+
+def year_indexes():
+    '''
+    Get the normalized embedding matrix of every year (but 2023), built once
+    per version of the compiled news data.
+
+    Output: dictionary with the index (see load_index) of each year
+    '''
+    version = data_access.file_version(compiled_filepath)
+    with _indexes_lock:
+        if version in _indexes:
+            return _indexes[version]
+
+        df = data_access.load(compiled_filepath, read_news, ['date', 'lead_paragraph'])
+        df['year'] = pd.DatetimeIndex(df['date']).year
+        indexes = {}
+        for year in sorted(df['year'].unique()):
+            if year == 2023:
+                continue
+            texts = list(df.loc[df['year']==year]['lead_paragraph'].dropna())
+            year_model(year, texts)
+            with year_lock(year):
+                indexes[year] = load_index(year)
+        _indexes.clear()
+        _indexes[version] = indexes
+
+    return indexes
+
+def most_similar(index, term, topn=15):
+    '''
+    Find the words of a year with the highest cosine similarity to a term:
+    one product of the normalized matrix with the term's vector, and a
+    partial sort of the scores.
+
+    Input: index (dict) - see load_index, term (string), topn (int) - number
+    of words
+    Output: list of (word, score) tuples, most similar first. Empty if the
+    term is not in the vocabulary of the year.
+    '''
+    position = index["positions"].get(term)
+    topn = min(topn, len(index["words"]) - 1)
+    if position is None or topn <= 0:
+        return []
+
+    scores = index["vectors"] @ index["vectors"][position]
+    scores[position] = -np.inf
+    best = np.argpartition(-scores, topn - 1)[:topn]
+    best = best[np.argsort(-scores[best], kind="stable")]
+
+    return [(index["words"][i], float(scores[i])) for i in best]
+
+def word_similarity(term, topn=15):
+    '''
+    This function gets the Word2Vec model of each year of news data as it
+    relates to police and Black Lives Matter (trained, updated or loaded from
+    disk by year_model) and finds the words most similar to a term in each
+    year from their normalized embedding matrices.
+
+    Input: term (string) - the term we are looking for similarity, topn (int)
+    - number of words per year
+    Output: list of (word, score, year) tuples with the top words per year
+    and their corresponding similarity score. Years where the term does not
+    appear have no words.
+    '''
+    term = term.strip().lower()
+    visualization_df = []
+    for year, index in year_indexes().items():
+        for word, score in most_similar(index, term, topn):
+            visualization_df.append((word, score, year))
+    
+    return visualization_df
@@ -3,37 +3,232 @@
 ##Last date updated: 03.01.23
 
 import pandas as pandas
-import nltk
+import os
+import copy
+import json
+import hashlib
 import pandas as pd
+import numpy as np
 import pathlib
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import plotly.express as px 
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-nltk.download([
-"vader_lexicon",
-])
-from nltk.sentiment import SentimentIntensityAnalyzer
-sia = SentimentIntensityAnalyzer()
+from project_protests.newspaper.storage import read_news
+from project_protests import data_access, nltk_resources
+from project_protests.query_params import workers
 
 BOUNDS = {"classifier": ([-1,0,1],["negative","positive"])}
 WORDS_TO_UPDATE = {
     "protest": 0, "brutality": 0
 }
+TEXT_COLUMNS = ["headline", "abstract", "lead_paragraph", "standfirst"]
+SCORE_KEYS = ["compound", "pos", "neg", "neu"]
 
 nyt_filepath = pathlib.Path(__file__).parent.parent/ "newspaper/nyt/raw_data/nyt_articles.csv"
 guardian_filepath = pathlib.Path(__file__).parent.parent / "newspaper/the_guardian/data/the_guardian_compiled.csv"
 
-def edit_sentiment_dictionary(update_dict = WORDS_TO_UPDATE):
+def lexicon_analyzer(update_dict = WORDS_TO_UPDATE):
     """
-    Edit sentiment dictionary to exclude certain words that are common and
-    neutral in the context but that the nltk dictionary classifies as negative.
+    Get a sentiment analyzer whose lexicon excludes certain words that are
+    common and neutral in the context but that the nltk dictionary classifies
+    as negative. The analyzer has its own copy of the lexicon, built once per
+    process and dictionary, so the shared VADER analyzer is never modified and
+    scores computed with different dictionaries do not mix.
     Inputs: 
         update_dict(dict): Dictionary of words to be updated in the dictionary that
         are going to be considered as neutral.
     Return:
-    None, it updates vader lexicon dictionary
+    SentimentIntensityAnalyzer with the updated lexicon
     """
-    sia.lexicon.update(update_dict)
+    base = nltk_resources.sentiment_analyzer()
+
+    def build():
+        sia = copy.copy(base)
+        sia.lexicon = dict(base.lexicon)
+        sia.lexicon.update(update_dict)
+        return sia
+
+    return nltk_resources.cached("sentiment_analyzer_" +
+                                lexicon_version(update_dict), build)
+
+def init_worker(update_dict = WORDS_TO_UPDATE):
+    """
+    Prepare the lexicon of a scoring process once, when the process starts
+    Inputs:
+        update_dict(dict): Dictionary of words to be updated in the dictionary
+    Return:
+    None, it builds the analyzer of the dictionary in the process
+    """
+    lexicon_analyzer(update_dict)
+
+def score_batch(texts, update_dict = WORDS_TO_UPDATE):
+    """
+    Calculate the sentiment scores of a batch of texts
+    Inputs:
+    - texts: list of strings
+    - update_dict: words updated in the lexicon used to score
+    Returns:
+    list: one [compound, pos, neg, neu] list per text
+    """
+    sia = lexicon_analyzer(update_dict)
+    results = []
+    for text in texts:
+        scores = sia.polarity_scores(text)
+        results.append([scores[key] for key in SCORE_KEYS])
+
+    return results
+
+def score_texts(texts, workers = None, update_dict = WORDS_TO_UPDATE,
+                batch_size = 500):
+    """
+    Calculate the sentiment scores of a column or iterable of texts. Each
+    distinct text is scored once and, with several workers, the distinct
+    texts are scored in batches by a pool of processes that build their
+    analyzer once when they start.
+    Inputs:
+    - texts: Series or iterable of texts. Missing values are scored as text,
+    as in sentiment_scores.
+    - workers: number of processes. None or 1 scores in the current process
+    and 0 uses one process per CPU.
+    - update_dict: words updated in the lexicon before scoring
+    - batch_size: number of texts sent to a process at a time
+    Returns:
+    dict: compound, pos, neg and neu scores, one array each aligned with texts
+    """
+    texts = pd.Series(list(texts), dtype = object).astype(str)
+    codes, uniques = pd.factorize(texts)
+    uniques = list(uniques)
+    batches = [uniques[i:i + batch_size] for i in range(0, len(uniques),
+                batch_size)]
+    if workers == 0:
+        workers = os.cpu_count()
+
+    score = partial(score_batch, update_dict = update_dict)
+    if workers is None or workers <= 1 or len(batches) <= 1:
+        results = [score(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers = workers, initializer = init_worker,
+                                initargs = (update_dict,)) as executor:
+            results = list(executor.map(score, batches))
+
+    scores = np.array([row for batch in results for row in batch],
+                    dtype = float).reshape(-1, len(SCORE_KEYS))
+    scores = scores[codes]
+
+    return {key: scores[:, i] for i, key in enumerate(SCORE_KEYS)}
+
+def lexicon_version(update_dict = WORDS_TO_UPDATE):
+    """
+    Identify the version of the lexicon by hashing the words updated in it
+    Inputs:
+        update_dict(dict): Dictionary of words updated in the dictionary
+    Return:
+    str: short hexadecimal hash
+    """
+    words = json.dumps(update_dict, sort_keys = True)
+
+    return hashlib.sha256(words.encode()).hexdigest()[:16]
+
+def scores_path(filename):
+    """
+    Get the path of the file with the sentiment scores of a news csv, stored
+    next to it
+    Inputs:
+    - filename: filename of the news csv
+    Returns:
+    str: path of the scores csv
+    """
+    return os.path.splitext(str(filename))[0] + "_sentiment.csv"
+
+def text_hashes(texts):
+    """
+    Hash every text of a column, so a changed text can be detected
+    Inputs:
+    - texts: Series of texts. Missing values are hashed as an empty text, so
+    they have the same hash whether the column was read from the csv (NaN)
+    or from the Parquet copy (<NA>).
+    Returns:
+    array: short hexadecimal hash of each text
+    """
+    return texts.astype(object).fillna("").astype(str).map(lambda text:
+        hashlib.sha256(text.encode()).hexdigest()[:16]).values
+
+def read_stored_scores(path, lexicon):
+    """
+    Read the saved sentiment scores computed with a version of the lexicon
+    Inputs:
+    - path: path of the scores csv
+    - lexicon: version of the lexicon
+    Returns:
+    df : saved scores, empty if there are none for this lexicon
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame({"id": pd.Series(dtype = str)})
+
+    stored = pd.read_csv(path, dtype = {"id": str})
+
+    return stored[stored["lexicon"] == lexicon]
+
+def update_scores(filename, lexicon = None, workers = workers):
+    """
+    Bring the saved sentiment scores of a news csv up to date. The store next
+    to the csv has one row per article id with, for each text column, the
+    hash of the text and its compound score under a version of the lexicon.
+    Only the texts of new articles, changed texts and texts scored with
+    another lexicon are scored; the other scores are reused. Articles that
+    are no longer in the csv keep their scores in the store.
+    Inputs:
+    - filename: filename of the news csv
+    - lexicon: version of the lexicon. The current version if None.
+    - workers: number of processes used to score the texts
+    Returns:
+    df : dataframe with the article id and a score column per text column
+    """
+    lexicon = lexicon or lexicon_version()
+    path = scores_path(filename)
+    df = read_news(filename).drop_duplicates("id")
+    stored = read_stored_scores(path, lexicon)
+
+    scores = pd.DataFrame({"id": df["id"].astype(str).values})
+    scores = scores.merge(stored, on = "id", how = "left")
+    columns = ["id", "lexicon"]
+    for col in TEXT_COLUMNS:
+        if col not in df.columns:
+            continue
+        hash_col, score_col = "{}_hash".format(col), "{}_score".format(col)
+        hashes = text_hashes(df[col])
+        if hash_col in scores.columns:
+            stale = scores[hash_col].values != hashes
+        else:
+            stale = np.ones(len(scores), dtype = bool)
+            scores[score_col] = np.nan
+        if stale.any():
+            scores.loc[stale, score_col] = score_texts(df[col].values[stale],
+                                                workers)["compound"]
+        scores[hash_col] = hashes
+        columns += [hash_col, score_col]
+    scores["lexicon"] = lexicon
+
+    history = stored[~stored["id"].isin(scores["id"])]
+    saved = pd.concat([scores[columns], history.reindex(columns = columns)])
+    saved.to_csv(path + ".tmp", index = False)
+    os.replace(path + ".tmp", path)
+
+    return scores[[col for col in columns if col.endswith("_score") or
+                    col == "id"]]
+
+def article_scores(filename):
+    """
+    Get the sentiment scores of a news csv, updated once per version of the
+    csv and of the lexicon and kept in memory between calls
+    Inputs:
+    - filename: filename of the news csv
+    Returns:
+    df : dataframe with the article id and a score column per text column
+    """
+    return data_access.load(filename, update_scores, lexicon_version())
 
 def sentiment_scores(filename, columns_list):
     """
@@ -46,17 +241,15 @@ def sentiment_scores(filename, columns_list):
     df : Updated df with new columns that classify the sentiment of the given columns
 
     """
-
-    edit_sentiment_dictionary()
-    
-    df = pd.read_csv(filename)
+    df = data_access.load(filename, read_news, ["id", "date"] + columns_list)
+    score_columns = ["{}_score".format(col) for col in columns_list]
+    df = df.merge(article_scores(filename)[["id"] + score_columns], on = "id",
+                how = "left", validate = "many_to_one")
     bounds, label = BOUNDS["classifier"]
 
     for col in columns_list:
         df[col] = df[col].astype(str) 
         if "{}".format(col) in df.columns:
-            df["{}_score".format(col)] = df["{}".format(col)].apply(lambda x:
-            sia.polarity_scores(x)["compound"])
             df["{}_sentiment".format(col)] = pd.cut(df["{}_score".format(col)],
             bins = bounds, labels = label, include_lowest = True, right = True)
 
@@ -0,0 +1,79 @@
+# Task: Tokenize news articles for the Word2Vec models
+import re
+from project_protests import nltk_resources
+
+TOKENIZER_VERSION = 2
+NON_LETTERS_RE = re.compile(r"[^a-z]+")
+# contractions that the NLTK word tokenizer splits in two
+CONTRACTIONS_RE = re.compile(r"\b(can)(not)\b|\b(gim|lem)(me)\b|"
+                            r"\b(gon|wan)(na)\b|\b(got)(ta)\b")
+ADDITIONAL_STOP_WORDS = ['way', 'come', 'came', 'new', 'york', 'monday',
+    'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+    'often', 'accross', 'knows', 'known', 'weeks', 'would', 'should', 'still',
+    'more', 'many', 'know', 'said', 'says', 'also', 'want', 'make', 'one',
+    'two', 'four', 'three', 'took', 'already', 'may', 'look', 'who', 'whose',
+    'get', 'take', 'like', 'including', 'include', 'more', 'much', 'first',
+    'week', 'day', 'recently','year','years']
+_stop_words = None
+
+def stop_words():
+    '''
+    English stop words as defined by NLTK plus common meaningless words of
+    the news articles, as a frozenset so checking a word is a single lookup.
+    The set is built on first use.
+
+    Output: frozenset of stop words
+    '''
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = frozenset(nltk_resources.stop_words() + ADDITIONAL_STOP_WORDS)
+
+    return _stop_words
+
+def split_contraction(match):
+    return " ".join(part for part in match.groups() if part)
+
+def tokenize(text):
+    '''
+    Split the text of one article into lowercase words, without stop words
+    and words of fewer than three letters. Every character that is not a
+    letter separates words.
+
+    Input: text (string)
+    Output: list of words
+    '''
+    text = NON_LETTERS_RE.sub(" ", text.lower())
+    text = CONTRACTIONS_RE.sub(split_contraction, text)
+    stop = stop_words()
+
+    return [word for word in text.split() if len(word) > 2 and word not in stop]
+
+def tokenize_articles(texts):
+    '''
+    Tokenize articles one at a time, skipping missing texts.
+
+    Input: texts (iterable of strings)
+    Output: generator with the list of words of each article
+    '''
+    for text in texts:
+        if isinstance(text, str):
+            yield tokenize(text)
+
+class ArticleCorpus:
+    '''
+    Corpus of articles that Word2Vec can iterate over once per epoch. Each
+    article is tokenized while it is read, so the corpus never holds the
+    tokens of every article at once.
+    '''
+
+    def __init__(self, texts):
+        '''
+        Input: texts (list of strings) - text of each article
+        '''
+        self.texts = texts
+
+    def __iter__(self):
+        return tokenize_articles(self.texts)
+
+    def __len__(self):
+        return len(self.texts)
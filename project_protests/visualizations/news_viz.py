@@ -6,7 +6,12 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pathlib
-from project_protests.visualizations.protest_viz import protest_data
+from project_protests.visualizations.protest_viz import protest_counts
+from project_protests.newspaper.storage import read_news
+from project_protests import data_access
+
+nyt_filepath = pathlib.Path(__file__).parent.parent / "newspaper/nyt/raw_data/nyt_articles.csv"
+guardian_filepath = pathlib.Path(__file__).parent.parent / "newspaper/the_guardian/data/the_guardian_compiled.csv"
 
 def news_counts():
     """
@@ -22,15 +27,13 @@ def news_counts():
     fig = make_subplots(specs=[[{"secondary_y": True}]])
 
     # add trade for Guardian data 
-    g_df_pivot = pivot_guardian(guardian_data( ))
+    g_df_pivot = pivot_guardian(guardian_data(['date']))
     fig.add_trace(go.Scatter(x=g_df_pivot["Year"], y=g_df_pivot['Count'], name="Guardian", mode="lines"), secondary_y=False)
     # add trace for NYT data 
-    n_df_pivot = pivot_nyt(nyt_data())
+    n_df_pivot = pivot_nyt(nyt_data(['date']))
     fig.add_trace(go.Scatter(x=n_df_pivot["Year"], y=n_df_pivot['Count'], name="NYT", mode="lines"), secondary_y=False)
     # add trace for protest data
-    p_df = protest_data()
-    p_df_pivot = p_df.groupby(['Year']).size().to_frame().reset_index()
-    p_df_pivot.rename({0:'Count'}, axis='columns', inplace=True)
+    p_df_pivot = protest_counts(['Year'])
     fig.add_trace(go.Scatter(x=p_df_pivot["Year"], y=p_df_pivot['Count'], name="Normalized Protests", mode="lines"), secondary_y=True)
 
     fig.update_yaxes(title_text="News Stories (#)", secondary_y=False)
@@ -51,17 +54,15 @@ def month_corr():
    Return: Plotly figure
    """
    # add trace for newspaper data 
-   df = guardian_data()
-   nyt = nyt_data()
+   df = guardian_data(['date'])
+   nyt = nyt_data(['date'])
    df = pd.concat([df, nyt], ignore_index = True)
 
    #  pivot data by year 
    df_pivot = df.groupby(['Year', 'Month']).size().to_frame().reset_index()
    df_pivot.rename(columns={0:'Count'}, inplace=True)
    # pivot data for protests 
-   p_df = protest_data()
-   p_df_pivot = p_df.groupby(['Year', 'Month']).size().to_frame().reset_index()
-   p_df_pivot.rename({0:'Count'}, axis='columns', inplace=True)
+   p_df_pivot = protest_counts(['Year', 'Month'])
 
    join = pd.merge(p_df_pivot, df_pivot, how ='left', on =['Month', 'Year'])
    join.rename(columns={'Count_x':'Count Protests', 'Count_y':'Count News'}, inplace=True)
@@ -80,14 +81,22 @@ def pivot_nyt(df):
     n_df_pivot.rename(columns={0:'Count'}, inplace=True)
     return n_df_pivot
 
-def nyt_data():
+def nyt_data(columns=None):
     """
-    Create dataframe from CSV of NY Times data
+    Create dataframe from NY Times data, reading only the given columns
+    (all of them if None). The data is loaded once per process.
 
-    Return: Plotly figure
+    Return: Pandas DataFrame (shared, do not modify its values in place)
+    """
+    return data_access.load(nyt_filepath, load_nyt, columns)
+
+def load_nyt(filepath, columns=None):
+    """
+    Helper function to load the NY Times data
+
+    Return: Pandas DataFrame
     """
-    filepath = pathlib.Path(__file__).parent.parent.parent / "project_protests/newspaper/nyt/raw_data/nyt_articles.csv"
-    df = pd.read_csv(filepath)
+    df = read_news(filepath, columns)
     df['date']= pd.to_datetime(df['date'])
     df.rename({'black lives matter':'Black Lives Matter', 
                 'police brutality': 'Police Brutality',
@@ -109,14 +118,22 @@ def pivot_guardian(df):
     g_df_pivot.rename(columns={0:'Count'}, inplace=True)
     return g_df_pivot
 
-def guardian_data():
+def guardian_data(columns=None):
     """
-    Create dataframe from CSV of Guardian data
+    Create dataframe from Guardian data, reading only the given columns
+    (all of them if None). The data is loaded once per process.
 
-    Return: Plotly figure
+    Return: Pandas DataFrame (shared, do not modify its values in place)
+    """
+    return data_access.load(guardian_filepath, load_guardian, columns)
+
+def load_guardian(filepath, columns=None):
+    """
+    Helper function to load the Guardian data
+
+    Return: Pandas DataFrame
     """
-    filepath = pathlib.Path(__file__).parent.parent.parent / "project_protests/newspaper/the_guardian/data/the_guardian_compiled.csv"
-    df = pd.read_csv(filepath)
+    df = read_news(filepath, columns)
     df['date']= pd.to_datetime(df['date'])
     df['Month'] = df['date'].dt.month
     df['Year'] = df['date'].dt.year 
@@ -6,17 +6,21 @@ from plotly.subplots import make_subplots
 import pathlib
 from project_protests.sentiment_analysis.pairwise_correlation import word_similarity
 
-def visualize_similarity():
+YEARS = [2017, 2018, 2019, 2020, 2021, 2022]
+
+def visualize_similarity(term="police"):
     '''
     This function takes in the similarity words list and creates bar charts
     by year for each set of words and score. 
     The resulting plot is a 2x3 chart of each year 2017-2022 and their corresponding
-    top words related to "police" as seen in NYT and the Guardian data.
+    top words related to the term (by default "police") as seen in NYT and the
+    Guardian data. Years where the term does not appear are left empty.
     '''
-    police_df = word_similarity("police")
-    df = pd.DataFrame(police_df, columns=["word", "score", "year"])
-    fig = make_subplots(rows=2,cols=3, subplot_titles=['2017', '2018', '2019', '2020', '2021', '2022'])
-    for idx, year in enumerate(df['year'].unique()):
+    term_df = word_similarity(term)
+    df = pd.DataFrame(term_df, columns=["word", "score", "year"])
+    fig = make_subplots(rows=2,cols=3, subplot_titles=[str(year) for year in YEARS])
+    for year in df['year'].unique():
+        idx = YEARS.index(year)
         chart = px.scatter(df[df['year']==year], x="word", y="score")
         chart.update_layout(title=str(year))
         if idx < 3:
@@ -25,9 +29,10 @@ def visualize_similarity():
             fig.append_trace(chart.data[0], row=2, col=(idx+1)-3)
     
     fig.update_layout(template="simple_white", 
-        title="Words Most Likely to Appear with 'Police'", title_x=0.5)
+        title="Words Most Likely to Appear with '{}'".format(term.strip().capitalize()),
+        title_x=0.5)
     
     for i,_ in enumerate(fig.data):
         fig.data[i].marker.color = "#1e4477"
    
-    return fig
\ No newline at end of file
+    return fig
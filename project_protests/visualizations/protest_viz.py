@@ -4,20 +4,63 @@ Lisette Solis
 import pandas as pd 
 import plotly.express as px 
 import plotly.graph_objects as go
+import os
 import pathlib
+from project_protests import data_access
+from project_protests.protest.process_protest_data import read_protests, \
+    read_protest_cube, write_protest_cube, cube_filepath
+
+protest_filepath = pathlib.Path(__file__).parent.parent / "protest/police-data.csv"
 
 def protest_data():
     """
-    Create data frame from the CSV of aggregate protest data
+    Create data frame from the CSV of aggregate protest data. The data is
+    loaded once per process.
+
+    Return: Pandas DataFrame (shared, do not modify its values in place)
+    """
+    return data_access.load(protest_filepath, load_protest)
+
+def load_protest(filepath):
+    """
+    Helper function to load the protest data, typed (datetime dates and
+    categorical places)
+
+    Return: Pandas DataFrame
     """
-    filepath = pathlib.Path(__file__).parent.parent.parent / "project_protests/protest/police-data.csv"
-    df = pd.DataFrame(pd.read_csv(filepath),\
-        columns = ['Location', 'Date', 'County', 'StateTerritory','City_Town'])
-    df['Date']= pd.to_datetime(df['Date'])
+    df = read_protests(filepath,
+        ['Location', 'Date', 'County', 'StateTerritory','City_Town'])
     df['Month'] = df['Date'].dt.month
     df['Year'] = df['Date'].dt.year 
     return df
 
+def protest_cube():
+    """
+    Load the counts of protests by year, month, state and city saved when the
+    protest data is processed. The cube is built again from the protest data
+    if it is missing or older than it. It is loaded once per process.
+
+    Return: Pandas DataFrame (shared, do not modify its values in place)
+    """
+    if not os.path.exists(cube_filepath) or \
+            os.path.getmtime(cube_filepath) < os.path.getmtime(protest_filepath):
+        write_protest_cube(read_protests(protest_filepath,
+            ['Date', 'StateTerritory', 'City_Town', 'Estimate_Low', 'Estimate_High']))
+    return data_access.load(cube_filepath, read_protest_cube)
+
+def protest_counts(dimensions):
+    """
+    Roll the protest cube up to the number of protests by some of its
+    dimensions. Protests missing a value of the dimensions are not counted.
+
+    Inputs:
+        dimensions (list): columns among Year, Month, StateTerritory and City_Town
+
+    Return: Pandas DataFrame with the dimensions and the Count column
+    """
+    cube = protest_cube()
+    return cube.groupby(dimensions, observed=True)['Count'].sum().reset_index()
+
 
 def protest_by_city():
     """
@@ -26,17 +69,14 @@ def protest_by_city():
 
     Returns: Plotly figure
     """
-    df = protest_data()
     # Agregate data at the national level 
-    df_national = df.groupby(['Year']).size().to_frame().reset_index()
-    df_national.rename(columns={0:'Count'}, inplace=True)
+    df_national = protest_counts(['Year'])
 
     # pivot data for cities
     cities = ['Baltimore', 'New York', 'Chicago', 'Detroit', 'Atlanta', 'Los Angeles', 'Minneapolis', 'Houston']
     cities.sort()
-    df_cities = df.loc[df['City_Town'].isin(cities)]
-    df_pivot = df_cities.groupby(['Year', 'City_Town']).size().to_frame().reset_index()
-    df_pivot.rename(columns={0:'Count'}, inplace=True)
+    df_pivot = protest_counts(['Year', 'City_Town'])
+    df_pivot = df_pivot.loc[df_pivot['City_Town'].isin(cities)]
 
     # create traces for figure 
     traces = []
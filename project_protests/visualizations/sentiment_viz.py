@@ -7,11 +7,16 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import nltk
 import pathlib
-from project_protests.sentiment_analysis.sentiment_analysis import sentiment_scores
+import threading
+from project_protests.sentiment_analysis.sentiment_analysis import sentiment_scores, lexicon_version
+from project_protests import data_access
 
 nyt_filepath = pathlib.Path(__file__).parent.parent/ "newspaper/nyt/raw_data/nyt_articles.csv"
 the_guardian_filepath = pathlib.Path(__file__).parent.parent / "newspaper/the_guardian/data/the_guardian_compiled.csv"
 
+_figures = {}
+_figures_lock = threading.Lock()
+
 def columns():
     """
     Function to iterate through the text columns and visualize sentiment scores 
@@ -22,6 +27,26 @@ def columns():
 
 
 def visualize_sentiment_scores(column):
+    """
+    Figure of a column, built once per version of the news data and of the
+    lexicon so switching between columns in the dashboard does not score
+    the articles again
+
+    Return: Plotly figure
+    """
+    key = (column, lexicon_version(), data_access.file_version(nyt_filepath),
+           data_access.file_version(the_guardian_filepath))
+    with _figures_lock:
+        fig = _figures.get(key)
+    if fig is None:
+        fig = sentiment_figure(column)
+        with _figures_lock:
+            _figures[key] = fig
+
+    return go.Figure(fig)
+
+
+def sentiment_figure(column):
     """
     Helper function to create figure for each column
 
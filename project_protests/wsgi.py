@@ -0,0 +1,62 @@
+##################################################
+# Task: Serve the dashboard in production        #
+##################################################
+
+import os
+from project_protests.html.dashboard import app, build_figures
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+HOST = os.environ.get("HOST", "127.0.0.1")
+PORT = int(os.environ.get("PORT", 8050))
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+# Load every figure (and the data behind the callbacks) before the workers
+# are forked, so they share it instead of building it once each
+build_figures()
+server = app.server
+
+
+if BaseApplication is not None:
+    class DashboardApplication(BaseApplication):
+        """
+        Gunicorn application that serves the already loaded dashboard from
+        several worker processes
+        """
+
+        def __init__(self, options):
+            """
+            Inputs:
+                options (dict): gunicorn settings
+            """
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return server
+
+
+def serve(host = HOST, port = PORT, workers = WORKERS):
+    """
+    Serve the dashboard. With gunicorn installed it runs one process per
+    worker, forked after the figures are loaded; otherwise it falls back to
+    the threaded Flask server without the debugger and reloader.
+
+    Inputs:
+        host (str): address to listen on
+        port (int): port to listen on
+        workers (int): number of worker processes
+    """
+    if BaseApplication is None:
+        app.run_server(host = host, port = port, debug = False)
+        return
+
+    DashboardApplication({"bind": "{}:{}".format(host, port),
+                        "workers": workers, "preload_app": True}).run()